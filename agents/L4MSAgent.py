@@ -1,6 +1,7 @@
 import random
 import numpy as np
 from collections import deque
+import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import models, layers, optimizers, activations, losses
 from tensorflow.keras.layers import Input, BatchNormalization, Conv2D
@@ -11,12 +12,13 @@ from math import inf
 from minesweeper import MinesweeperCore
 from tensorflow.keras.optimizers import SGD
 from agents.abstract_agent import AbstractAgent
+from agents.folded_network import FoldedNetwork
 
 class L4MSAgent (AbstractAgent):
     """
     Represents a 6-Layer MineSweeper Agent.
     """
-    def __init__(self, side, learning_rate=0.001):
+    def __init__(self, side, learning_rate=0.001, top_k=1, seed=None, inference='predict'):
         """
         Initializes the minesweeper agent.
 
@@ -24,12 +26,23 @@ class L4MSAgent (AbstractAgent):
         :type side: int.
         :param learning_rate: learning rate for the network.
         :type learning_rate: float.
+        :param top_k: number of best unknown tiles the move is drawn from, in proportion to the network's output.
+            1 always plays the best tile, None draws from all unknown tiles.
+        :type top_k: int.
+        :param seed: seed or generator of the random stream used to draw the moves.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :param inference: how boards are scored when playing, see compile_inference.
+        :type inference: str.
         """
         self.side = side
         self.learning_rate = learning_rate
+        self.top_k = top_k
+        self.rng = np.random.default_rng(seed)
         self.model = self.make_model()
+        self.compile_inference(inference)
         self.num_incorretas = 0                        # this is only used of research purpose
         self.num_plays = 0
+        self.last_incorrect = np.zeros(0, dtype=int)  # incorrect plays of each board in the last act_batch call
 
     def make_model(self):
         """
@@ -77,42 +90,109 @@ class L4MSAgent (AbstractAgent):
 
     def adjust_shape(self, table):
         """
-        Adjusts the shape of the game board from a matrix to a full long vector.
+        Normalizes game boards and adjusts their shape to the network's input.
 
-        :param table: mine sweeper game board.
-        :type table: Numpy matrix.
-        :return: the newly shaped game board to a vector.
+        :param table: mine sweeper game board, or stack of boards.
+        :type table: Numpy array.
+        :return: the newly shaped game boards, with shape (num_boards, side, side, 1).
         :rtype: Numpy array.
         """
         table = (table+1)/10.0
-        table = np.expand_dims(table, axis=0)
-        table = np.expand_dims(table, axis=0)
-        table = table.reshape(1, self.side, self.side, 1)
+        table = table.reshape(-1, self.side, self.side, 1)
         return table
 
+    def reset(self, seed=None):
+        """
+        Resets agent.
+
+        :param seed: if given, restarts the random stream used to draw the moves from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
     def act(self, state):
         """
-        Chooses an action using an epsilon-greedy policy.
+        Chooses an action on the board, see act_batch.
 
         :param state: current state.
-        :type state: NumPy array with dimension (1, 2).
-        :return: chosen action.
-        :rtype: int.
-        """
-        input_state = self.adjust_shape(state)
-        output = self.model.predict(input_state)
-        #print(output)
-        self.num_plays = self.num_plays + 1
-        while True:
-            index = np.argmax(output)
-            i = index // self.side
-            j = index % self.side
-            if state[i, j] != MinesweeperCore.UNKNOWN_CELL:
-                self.num_incorretas = self.num_incorretas + 1
-                output[0, index] = -inf
-            else:
-                break
-        return i, j
+        :type state: NumPy array with shape (side, side).
+        :return: chosen action (i, j).
+        :rtype: tuple.
+        """
+        rows, columns = self.act_batch(np.asarray(state)[np.newaxis])
+        return int(rows[0]), int(columns[0])
+
+    def act_batch(self, boards):
+        """
+        Chooses one action per board, scoring all boards in a single forward pass.
+
+        :param boards: game boards.
+        :type boards: NumPy array with shape (num_boards, side, side).
+        :return: (rows, columns) of the chosen tiles.
+        :rtype: (NumPy array of int, NumPy array of int).
+        """
+        boards = np.asarray(boards).reshape(-1, self.side * self.side)
+        output = np.asarray(self.forward(self.adjust_shape(boards)))
+        index = self.select(output, boards == MinesweeperCore.UNKNOWN_CELL)
+        return index // self.side, index % self.side
+
+    def select(self, output, legal):
+        """
+        Chooses one tile per board among the legal ones. Tiles already open are masked out of the network's
+        output in one operation, then the best tile is taken, or a tile is drawn among the top_k best ones.
+        The open tiles ranked above the chosen tile are counted as incorrect plays.
+
+        :param output: network's output, with shape (num_boards, side * side).
+        :type output: NumPy array.
+        :param legal: unknown tiles of each board, with shape (num_boards, side * side).
+        :type legal: NumPy array of bool.
+        :return: index i * side + j of the chosen tile on each board.
+        :rtype: NumPy array of int.
+        """
+        scores = np.where(legal, output, -inf)
+        rows = np.arange(len(scores))
+        if self.top_k == 1:
+            index = np.argmax(scores, axis=1)
+        else:
+            k = scores.shape[1] if self.top_k is None else min(self.top_k, scores.shape[1])
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            candidate_legal = np.take_along_axis(legal, candidates, axis=1)
+            weights = np.where(candidate_legal, np.maximum(np.take_along_axis(output, candidates, axis=1), 0), 0)
+            # Draws uniformly among the legal candidates when the network gives them no weight
+            weights = np.where(weights.sum(axis=1, keepdims=True) > 0, weights, candidate_legal)
+            cumulative = np.cumsum(weights, axis=1)
+            draws = self.rng.random((len(scores), 1)) * cumulative[:, -1:]
+            choice = np.minimum(np.sum(cumulative <= draws, axis=1), k - 1)
+            index = candidates[rows, choice]
+        # Open tiles ranked above the chosen tile, i.e. the incorrect plays of trying tiles in order
+        self.last_incorrect = np.sum(~legal & (output > scores[rows, index][:, np.newaxis]), axis=1)
+        self.num_incorretas = self.num_incorretas + int(self.last_incorrect.sum())
+        self.num_plays = self.num_plays + len(index)
+        return index
+
+    def compile_inference(self, inference):
+        """
+        Chooses how boards are scored when playing:
+        'predict' calls the Keras model on each batch,
+        'function' runs the model in inference mode through a traced tf.function,
+        'numpy' runs a NumPy copy of the network with batch normalization folded into the convolutions.
+        The compiled paths copy the current weights, and are compiled again when weights are loaded.
+
+        :param inference: 'predict', 'function' or 'numpy'.
+        :type inference: str.
+        """
+        self.inference = inference
+        if inference == 'predict':
+            self.forward = self.model.predict_on_batch
+        elif inference == 'function':
+            traced = tf.function(lambda boards: self.model(boards, training=False),
+                                 input_signature=[tf.TensorSpec([None, self.side, self.side, 1], tf.float32)])
+            self.forward = lambda boards: traced(tf.constant(boards, dtype=tf.float32)).numpy()
+        elif inference == 'numpy':
+            self.forward = FoldedNetwork.from_model(self.model)
+        else:
+            raise ValueError("Unknown inference mode: " + inference)
 
     def load(self, name):
         """
@@ -122,6 +202,7 @@ class L4MSAgent (AbstractAgent):
         :type name: str.
         """
         self.model.load_weights(name)
+        self.compile_inference(self.inference)
 
     def save(self, name):
         """
@@ -5,5 +5,5 @@ class AbstractAgent:
     def act(self, table):
         raise "Not implemented error."
 
-    def reset(self):
+    def reset(self, seed=None):
         pass
\ No newline at end of file
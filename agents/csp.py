@@ -1,59 +1,151 @@
+import itertools
+import time
 import numpy as np
+from collections import deque
+from functools import reduce
+from math import comb, gcd
 from minesweeper import MinesweeperCore
 from agents.abstract_agent import AbstractAgent
+from agents.solution_cache import SolutionCache
+
+# Offsets of the 3x3 neighbourhood of a tile, in row-major order
+NEIGHBOUR_OFFSETS = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)])
+
+# Number of samples whose random choices are drawn at once by CSPSolver.sample_answers
+_SAMPLE_BLOCK = 64
+
+
+def _popcount(mask):
+    """
+    Counts the set bits of a bitmask.
+    """
+    return bin(mask).count('1')
+
+
+def _bits(mask):
+    """
+    Yields the indices of the set bits of a bitmask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _row_reduce(rows):
+    """
+    Reduces integer rows [coefficients..., value] to reduced row echelon form with fraction-free elimination,
+    dividing every row by the greatest common divisor of its entries.
+    """
+    rows = [row[:] for row in rows]
+    pivot_row = 0
+    for column in range(len(rows[0]) - 1):
+        pivot = next((k for k in range(pivot_row, len(rows)) if rows[k][column] != 0), None)
+        if pivot is None:
+            continue
+        rows[pivot_row], rows[pivot] = rows[pivot], rows[pivot_row]
+        pivot = rows[pivot_row]
+        for k in range(len(rows)):
+            if k != pivot_row and rows[k][column] != 0:
+                row = [pivot[column] * a - rows[k][column] * b for a, b in zip(rows[k], pivot)]
+                divisor = reduce(gcd, row)
+                rows[k] = [a // divisor for a in row] if divisor > 1 else row
+        pivot_row += 1
+        if pivot_row == len(rows):
+            break
+    return rows
+
+
+def _convolve(first, second):
+    """
+    Multiplies two polynomials given by their integer coefficients, without overflow.
+    """
+    result = [0] * (len(first) + len(second) - 1)
+    for i, a in enumerate(first):
+        for j, b in enumerate(second):
+            result[i + j] += a * b
+    return result
+
 
 class MinesweeperConstraint:
     """
     Base class for the minesweeper constraints.
+    Variables are the indices of the unknown tiles on the frontier, stored as the set bits of an integer.
     """
-    def __init__(self, variables, value):
+    def __init__(self, mask, value):
         """
         Creates a constraint i.e. (2, 1) + (2, 2) + (2, 3) = 2.
 
-        :param variables: list of tiles with an associated constraint.
-        :type variables: list of tuples (i, j).
-        :param value: number of tiles in variables containing bombs.
+        :param mask: bitmask of the variables with an associated constraint, bit k standing for variable k.
+        :type mask: int.
+        :param value: number of variables in mask containing bombs.
         :type value: int.
         """
-        self.variables = variables
+        self.mask = mask
         self.value = value
 
-    def solvable(self, assignment):
+    @property
+    def variables(self):
+        """
+        Lists the variables of the constraint.
+
+        :return: indices of the variables in mask.
+        :rtype: list of int.
+        """
+        return list(_bits(self.mask))
+
+    def solvable(self, assigned, bombs):
         """
         Checks if a minesweeper constraint is still solvable after assignment.
 
-        :param assignment: maps each tile to its value of containing a bomb (1 for true, 0 for false).
-        :type assignment: dictionary.
+        :param assigned: bitmask of the assigned variables.
+        :type assigned: int.
+        :param bombs: bitmask of the variables assigned to contain a bomb.
+        :type bombs: int.
         :return: still solvable flag
         :rtype: bool
         """
-        new_value = self.value
-        non_constrained = 0
-        for variable in self.variables:
-            if variable not in assignment:
-                non_constrained = non_constrained + 1
-            else:
-                new_value = new_value - assignment[variable]
-        return 0 <= new_value <= non_constrained
+        new_value = self.value - _popcount(self.mask & bombs)
+        return 0 <= new_value <= _popcount(self.mask & ~assigned)
 
 
 class CSPSolver:
     """
     Constraint-satisfaction problem solver for minesweeper.
     """
-    def __init__(self, variables=[], constraints={}):
+    def __init__(self, variables=[], constraints=[], max_nodes=None, max_time=None, rng=None):
         """
         Initializes the constraint-satisfaction problem solver.
+        Solutions are counted as they are found, keeping running totals and per-variable bomb counts,
+        so memory does not grow with the number of solutions.
+        With a node or time budget the search, or the sampling, stops when the budget runs out, leaving the counts
+        found so far. The budget covers one call of count_answers, get_answers or sample_answers.
 
-        :param variables: list of tiles with an associated constraint.
-        :type variables: list of tuples (i, j).
-        :param constraints: maps tiles to its constraints.
-        :type constraints: dictionary.
+        :param variables: indices of the variables with an associated constraint.
+        :type variables: list of int.
+        :param constraints: constraints over the variables.
+        :type constraints: list of MinesweeperConstraints.
+        :param max_nodes: maximum number of search nodes, or of variables assigned while sampling, None for no limit.
+        :type max_nodes: int.
+        :param max_time: maximum search or sampling time in seconds, None for no limit.
+        :type max_time: float.
+        :param rng: generator used to try the values of each variable in random order when the search has a budget,
+            so that the solutions found before it runs out are spread over the search tree.
+        :type rng: numpy Generator.
         """
         self.variables = variables
         self.domains = [0, 1]
         self.constraints = {}
-        self.solutions = []
+        self.solutions = None  # Only stored when asked for by get_answers
+        self.by_bombs = True
+        self.totals = []
+        self.bomb_counts = {}
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.rng = rng if max_nodes is not None or max_time is not None else None
+        self.nodes = 0
+        self.deadline = None
+        self.complete = True
         for variable in self.variables:
             self.constraints[variable] = []
         for constraint in constraints:
@@ -61,73 +153,214 @@ class CSPSolver:
 
     def add_constraint(self, constraint):
         """
-        Adds a constraint to each of the tiles associated with that constraint.
+        Adds a constraint to each of the variables associated with that constraint.
 
         :param constraint: minesweeper constraint.
         :type constraint: MinesweeperConstraint.
         """
         for variable in constraint.variables:
-            if variable not in self.variables:
+            if variable not in self.constraints:
                 raise LookupError("Variable not in CSP")
             else:
                 self.constraints[variable].append(constraint)
 
-    def consistent_assignment(self, variable, assignment):
+    def consistent_assignment(self, variable, assigned, bombs):
         """
-        Given a new set of assignments, checks if the tile's constraints still have a solution.
+        Given a new set of assignments, checks if the variable's constraints still have a solution.
 
-        :param variable: position of a tile
-        :type variable: tuple
-        :param assignment: maps each tile to its value of containing a bomb (1 for true, 0 for false).
-        :type assignment: dictionary.
+        :param variable: index of a variable.
+        :type variable: int.
+        :param assigned: bitmask of the assigned variables.
+        :type assigned: int.
+        :param bombs: bitmask of the variables assigned to contain a bomb.
+        :type bombs: int.
         :return: contraints still solvable flag.
         :rtype: bool.
         """
         for constraint in self.constraints[variable]:
-            if not constraint.solvable(assignment):
+            if not constraint.solvable(assigned, bombs):
                 return False
         return True
 
-    def backtracking_search(self, assignment={}):
+    def backtracking_search(self, assigned=0, bombs=0, depth=0):
         """
-        Produces solutions for the CSP.
+        Produces solutions for the CSP, assigning the variables in order.
 
-        :param assignment: maps each tile to its value of containing a bomb (1 for true, 0 for false).
-        :type assignment: dictionary.
+        :param assigned: bitmask of the assigned variables.
+        :type assigned: int.
+        :param bombs: bitmask of the variables assigned to contain a bomb.
+        :type bombs: int.
+        :param depth: number of assigned variables.
+        :type depth: int.
         :return: signals the function to end search.
         :rtype: null.
         """
-        if len(assignment) == len(self.variables):
-            self.solutions.append(assignment)
+        if not self.complete:
             return None
-        unassigned = []
-        for variable in self.variables:
-            if variable not in assignment:
-                unassigned.append(variable)
-        first = unassigned[0]
-        for value in self.domains:
-            local_assignment = assignment.copy()
-            local_assignment[first] = value
-            if self.consistent_assignment(first, local_assignment):
-                self.backtracking_search(local_assignment)
+        self.nodes += 1
+        if (self.max_nodes is not None and self.nodes > self.max_nodes) or \
+                (self.deadline is not None and time.perf_counter() > self.deadline):
+            self.complete = False
+            return None
+        if depth == len(self.variables):
+            self.count(bombs)
+            return None
+        variable = self.variables[depth]
+        bit = 1 << variable
+        domains = self.domains
+        if self.rng is not None and self.rng.random() < 0.5:
+            domains = domains[::-1]
+        for value in domains:
+            local_bombs = bombs | bit if value == 1 else bombs
+            if self.consistent_assignment(variable, assigned | bit, local_bombs):
+                self.backtracking_search(assigned | bit, local_bombs, depth + 1)
         return None
 
+    def count(self, solution):
+        """
+        Adds a solution to the running counts.
+
+        :param solution: bitmask of the variables containing a bomb.
+        :type solution: int.
+        """
+        num_bombs = _popcount(solution) if self.by_bombs else 0
+        self.totals[num_bombs] += 1
+        for variable in _bits(solution):
+            self.bomb_counts[variable][num_bombs] += 1
+        if self.solutions is not None:
+            self.solutions.append(solution)
+
     def get_answers(self):
         """
-        Runs backtracking search and returns solutions.
+        Runs backtracking search and returns solutions. Memory grows with the number of solutions,
+        count_answers should be preferred.
 
-        :return: solutions to the CSP.
-        :rtype: list of dictionaries (assignments).
+        :return: solutions to the CSP, as bitmasks of the variables containing a bomb.
+        :rtype: list of int.
         """
-        self.backtracking_search()
+        self.solutions = []
+        self.start_search()
         return self.solutions
 
+    def count_answers(self, by_bombs=True):
+        """
+        Runs backtracking search, counting the solutions instead of storing them.
+
+        :param by_bombs: groups the counts by the number of bombs of the solutions.
+        :type by_bombs: bool.
+        :return: (number of solutions [with k bombs],
+            number of solutions [with k bombs] where each variable contains a bomb,
+            flag telling if the search was complete or stopped by the budget)
+        :rtype: (list of int or int, dictionary of lists of int or of int, bool).
+        """
+        self.by_bombs = by_bombs
+        self.solutions = None
+        self.start_search()
+        if not by_bombs:
+            return self.totals[0], {variable: counts[0] for variable, counts in self.bomb_counts.items()}, \
+                self.complete
+        return self.totals, self.bomb_counts, self.complete
+
+    def sample_answers(self, num_samples, rng):
+        """
+        Estimates the counts of count_answers without enumerating the solutions, by sequential importance sampling.
+        Each sample assigns the variables in breadth-first order over the constraints, so that constraints
+        are completed early, picking uniformly among the values that keep the constraints solvable, and is
+        weighted by the product of the number of values available at each step. The weighted sums are
+        proportional to unbiased estimates of the counts, which is all the probabilities need.
+        When every sample dead-ends, all counts are 0. With a budget, sampling stops before a sample that could
+        exceed it, keeping the samples drawn so far.
+
+        :param num_samples: number of samples to draw.
+        :type num_samples: int.
+        :param rng: random number generator.
+        :type rng: numpy Generator.
+        :return: (weighted number of solutions with k bombs,
+            weighted number of solutions with k bombs where each variable contains a bomb,
+            flag telling if the counts are exact, always False)
+        :rtype: (list of int, dictionary of lists of int, bool).
+        """
+        self.totals = [0] * (len(self.variables) + 1)
+        self.bomb_counts = {variable: [0] * (len(self.variables) + 1) for variable in self.variables}
+        self.complete = False
+        self.start_budget()
+        order = self.breadth_first_order()
+        # The choices are drawn in blocks, so that a sampling cut by the budget does not draw all of them
+        blocks = (rng.integers(0, 2, size=(min(_SAMPLE_BLOCK, num_samples - start), len(order))).tolist()
+                  for start in range(0, num_samples, _SAMPLE_BLOCK))
+        for choices in itertools.chain.from_iterable(blocks):
+            if (self.max_nodes is not None and self.nodes + len(order) > self.max_nodes) or \
+                    (self.deadline is not None and time.perf_counter() > self.deadline):
+                break
+            assigned = bombs = 0
+            weight = 1
+            for variable, choice in zip(order, choices):
+                self.nodes += 1
+                bit = 1 << variable
+                assigned |= bit
+                values = [value for value in (0, bit) if self.consistent_assignment(variable, assigned, bombs | value)]
+                if len(values) == 0:
+                    weight = 0
+                    break
+                if len(values) == 2:
+                    weight *= 2
+                bombs |= values[choice % len(values)]
+            if weight != 0:
+                num_bombs = _popcount(bombs)
+                self.totals[num_bombs] += weight
+                for variable in _bits(bombs):
+                    self.bomb_counts[variable][num_bombs] += weight
+        return self.totals, self.bomb_counts, self.complete
+
+    def breadth_first_order(self):
+        """
+        Orders the variables by breadth-first search, two variables being adjacent when they share a constraint.
+
+        :return: indices of the variables.
+        :rtype: list of int.
+        """
+        order = []
+        visited = set()
+        for start in self.variables:
+            if start in visited:
+                continue
+            visited.add(start)
+            queue = deque([start])
+            while queue:
+                variable = queue.popleft()
+                order.append(variable)
+                for constraint in self.constraints[variable]:
+                    for neighbour in _bits(constraint.mask):
+                        if neighbour not in visited:
+                            visited.add(neighbour)
+                            queue.append(neighbour)
+        return order
+
+    def start_search(self):
+        """
+        Resets the counts and the budget, and runs backtracking search.
+        """
+        size = len(self.variables) + 1 if self.by_bombs else 1
+        self.totals = [0] * size
+        self.bomb_counts = {variable: [0] * size for variable in self.variables}
+        self.complete = True
+        self.start_budget()
+        self.backtracking_search()
+
+    def start_budget(self):
+        """
+        Resets the node count and starts the clock of the budget.
+        """
+        self.nodes = 0
+        self.deadline = None if self.max_time is None else time.perf_counter() + self.max_time
+
 
 class MinesweeperAgent (AbstractAgent):
     """
     Simple strategy Minesweeper agent.
     """
-    def __init__(self, size, num_bombs, heuristic=True):
+    def __init__(self, size, num_bombs, heuristic=True, seed=None, gaussian_elimination=True, cache=None,
+                 max_nodes=None, max_time=None, max_exact_variables=40, num_samples=2000):
         """
         Initializes the Minesweeper agent considering a square board.
 
@@ -137,25 +370,61 @@ class MinesweeperAgent (AbstractAgent):
         :type num_bombs: int.
         :param heuristic: whether to use the corner heuristic or not.
         :type heuristic: bool.
+        :param seed: seed or generator of the random stream used for random guesses.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :param gaussian_elimination: whether to look for forced tiles with linear algebra before searching.
+        :type gaussian_elimination: bool.
+        :param cache: cache of solved groups of constraints, to share between agents. None disables caching, since
+            groups are usually cheaper to solve again than to look up.
+        :type cache: SolutionCache.
+        :param max_nodes: node budget of the CSP searches and sampling of a whole move, shared by all of its groups
+            of constraints, None for no limit.
+        :type max_nodes: int.
+        :param max_time: time budget in seconds of the CSP searches and sampling of a whole move, shared by all of its
+            groups of constraints, None for no limit.
+        :type max_time: float.
+        :param max_exact_variables: largest group of constraints solved exactly, larger groups are sampled.
+            None always solves exactly.
+        :type max_exact_variables: int.
+        :param num_samples: number of samples drawn for each sampled group.
+        :type num_samples: int.
         """
         self.initial_position = (int(size/2), int(size/2))
         self.board_size = size
         self.num_bombs = num_bombs
-        self.constraints = []
         self.nobomb_position = [self.initial_position]
         self.bomb_position = []
-        self.unknown_position = []
+        self.unknown_position = {}  # Unknown tiles as keys, kept in row-major order
+        self.last_board = None
+        self.clear_constraints()
         self.heuristic = heuristic
+        self.gaussian_elimination = gaussian_elimination
+        self.cache = cache if cache is not None else SolutionCache(max_size=0)
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.nodes_left = None  # Node budget left for the current move
+        self.deadline = None  # End of the time budget of the current move
+        self.max_exact_variables = max_exact_variables
+        self.num_samples = num_samples
+        self.estimate_flag = False  # Verifies if the last probabilities are estimates (search out of budget or sampled)
+        self.num_searches = 0  # Number of CSPSolver searches, only used for benchmarking
         self.guess_flag = False  # Verifies if the agent has made a guess
+        self.rng = np.random.default_rng(seed)
 
-    def reset(self):
+    def reset(self, seed=None):
         """
         Resets agent.
+
+        :param seed: if given, restarts the random stream used for random guesses from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
         """
-        self.constraints = []
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
         self.nobomb_position = [self.initial_position]
         self.bomb_position = []
-        self.unknown_position = []
+        self.unknown_position = {}
+        self.last_board = None
+        self.clear_constraints()
         self.guess_flag = False
 
     def act(self, board):
@@ -163,9 +432,15 @@ class MinesweeperAgent (AbstractAgent):
         Returns a position (i, j) to play using simple strategy.
 
         :param board: game board.
-        :type board: numpy matrix.
+        :type board: numpy array.
         """
         constraints, constrained_variables = self.read_board(board)
+        # Looks for forced tiles with linear algebra before guessing
+        while self.gaussian_elimination and len(self.nobomb_position) == 0 and len(constraints) > 1:
+            bombs, safe = self.linear_deduction(constraints, constrained_variables)
+            if bombs == 0 and safe == 0:
+                break
+            constraints, constrained_variables = self.learn([], bombs, safe)
         # Play on first known empty tile
         self.guess_flag = False
         if len(self.nobomb_position) != 0:
@@ -184,121 +459,519 @@ class MinesweeperAgent (AbstractAgent):
                 if position not in self.bomb_position and position in self.unknown_position:
                     self.guess_flag = True
                     return position
-        # Gets possible answers for CSP
-        csp = CSPSolver(constrained_variables, constraints)
-        answers = csp.get_answers()
-        # Calculates probabilities and returns the tile with highest probability of not containing a bomb
-        probabilities = {}  # Variables as keys, [All cases, Cases of 0, Probability to be 0]
-        for variable in constrained_variables:
-            probabilities[variable] = [0, 0, 0]
-        for answer in answers:
-            for variable in answer:
-                probabilities[variable][0] += 1
-                if answer[variable] == 0:
-                    probabilities[variable][1] += 1
+        # Calculates probabilities, solving each independent group of constraints separately,
+        # and returns the tile with highest probability of not containing a bomb
+        constrained = set(self.frontier[variable] for variable in constrained_variables)
+        unconstrained_positions = [position for position in self.unknown_position
+                                   if position not in self.bomb_position and position not in constrained]
+        probabilities, unconstrained_probability = self.mine_probabilities(constraints, constrained_variables,
+                                                                           len(unconstrained_positions))
         best_position = [(0, 0), 0]
-        for variable in constrained_variables:
-            if probabilities[variable][0] != 0:
-                probabilities[variable][2] = probabilities[variable][1] / probabilities[variable][0]
-            if probabilities[variable][2] > best_position[1] and variable not in self.bomb_position:
-                best_position[1] = probabilities[variable][2]
-                best_position[0] = variable
-        if best_position[1] == 0:
+        for variable in sorted(constrained_variables, key=lambda variable: self.frontier[variable]):
+            if variable in probabilities and 1 - probabilities[variable] > best_position[1] \
+                    and self.frontier[variable] not in self.bomb_position:
+                best_position[1] = 1 - probabilities[variable]
+                best_position[0] = self.frontier[variable]
+        if unconstrained_probability is not None and 1 - unconstrained_probability > best_position[1]:
+            rand_index = self.rng.integers(len(unconstrained_positions))
+            best_position[0] = unconstrained_positions[rand_index]
+        elif best_position[1] == 0:
             playable_positions = [position for position in self.unknown_position if position not in self.bomb_position]
-            rand_index = np.random.randint(len(playable_positions))
+            rand_index = self.rng.integers(len(playable_positions))
             best_position[0] = playable_positions[rand_index]
         self.guess_flag = True
         return best_position[0]
 
+    def split_components(self, constraints, variables):
+        """
+        Splits the constraints into independent groups, two constraints belonging to the same group
+        when they share a tile. Each group can be solved on its own.
+
+        :param constraints: simplified constraints.
+        :type constraints: list of MinesweeperConstraints.
+        :param variables: indices of the variables associated with constraints.
+        :type variables: list of int.
+        :return: variables and constraints of each group.
+        :rtype: list of tuples (list of int, list of MinesweeperConstraints).
+        """
+        parent = {variable: variable for variable in variables}
+
+        def find(variable):
+            while parent[variable] != variable:
+                parent[variable] = parent[parent[variable]]
+                variable = parent[variable]
+            return variable
+
+        constraints = [constraint for constraint in constraints if constraint.variables != []]
+        for constraint in constraints:
+            for variable in constraint.variables:
+                parent.setdefault(variable, variable)
+                parent[find(variable)] = find(constraint.variables[0])
+        groups = {}
+        for variable in parent:
+            groups.setdefault(find(variable), ([], []))[0].append(variable)
+        for constraint in constraints:
+            groups[find(constraint.variables[0])][1].append(constraint)
+        return list(groups.values())
+
+    def count_solutions(self, variables, constraints):
+        """
+        Counts the solutions of a group of constraints by their number of bombs.
+        Groups already met in the same local configuration are read from the cache. Groups larger than
+        max_exact_variables, or whose search runs out of budget, are sampled instead. The search and the sampling
+        take their nodes and time from the budget left for the move. When the counts are sampled, estimate_flag is set.
+
+        :param variables: indices of the variables of the group.
+        :type variables: list of int.
+        :param constraints: constraints of the group.
+        :type constraints: list of MinesweeperConstraints.
+        :return: (number of solutions with k bombs,
+            number of solutions with k bombs where each variable contains a bomb)
+        :rtype: (list of int, dictionary of lists of int).
+        """
+        cached_group = self.cache.caches(len(variables))
+        if cached_group:
+            position = {variable: k for k, variable in enumerate(variables)}
+            key, order = self.cache.key([self.frontier[variable] for variable in variables],
+                                        [([position[variable] for variable in _bits(constraint.mask)], constraint.value)
+                                         for constraint in constraints])
+            cached = self.cache.get(key)
+            if cached is not None:
+                totals, bombs = cached
+                return totals, {variable: bombs[order[k]] for k, variable in enumerate(variables)}
+        csp = CSPSolver(variables, constraints, *self.remaining_budget(), rng=self.rng)
+        self.num_searches += 1
+        if self.max_exact_variables is not None and len(variables) > self.max_exact_variables:
+            totals, bombs, complete = csp.sample_answers(self.num_samples, self.rng)
+        else:
+            # Half of the budget left is kept for sampling, in case the search runs out of it
+            csp.max_nodes, csp.max_time = self.remaining_budget(0.5)
+            totals, bombs, complete = csp.count_answers()
+            if not complete:
+                # A cut search may have found no solution at all, and gives no bomb to the variables it never
+                # reached, so the group is estimated by sampling instead
+                self.spend_budget(csp.nodes)
+                csp.max_nodes, csp.max_time = self.remaining_budget()
+                totals, bombs, complete = csp.sample_answers(self.num_samples, self.rng)
+        self.spend_budget(csp.nodes)
+        if not complete:
+            self.estimate_flag = True
+        elif cached_group:
+            canonical = [None] * len(variables)
+            for k, variable in enumerate(variables):
+                canonical[order[k]] = bombs[variable]
+            self.cache.put(key, (totals, canonical))
+        return totals, bombs
+
+    def remaining_budget(self, share=1.0):
+        """
+        Returns a share of the search budget left for the current move.
+
+        :param share: fraction of the budget left.
+        :type share: float.
+        :return: (number of nodes, None for no limit, time in seconds, None for no limit)
+        :rtype: (int, float).
+        """
+        max_nodes = None if self.nodes_left is None else int(self.nodes_left * share)
+        max_time = None if self.deadline is None else max(self.deadline - time.perf_counter(), 0.0) * share
+        return max_nodes, max_time
+
+    def spend_budget(self, nodes):
+        """
+        Takes the nodes used by a search or by sampling from the node budget left for the current move.
+
+        :param nodes: number of nodes used.
+        :type nodes: int.
+        """
+        if self.nodes_left is not None:
+            self.nodes_left = max(self.nodes_left - nodes, 0)
+
+    def linear_deduction(self, constraints, variables):
+        """
+        Finds forced tiles by treating each group of constraints as a 0/1 linear system. The system is reduced
+        with integer Gaussian elimination, then the bounds of every reduced equation are checked: when its value
+        equals the sum of its positive (or negative) coefficients, all of its variables are forced.
+
+        :param constraints: simplified constraints.
+        :type constraints: list of MinesweeperConstraints.
+        :param variables: indices of the variables associated with constraints.
+        :type variables: list of int.
+        :return: (bitmask of the forced bombs, bitmask of the forced empty tiles)
+        :rtype: (int, int)
+        """
+        bombs = 0
+        safe = 0
+        for group_variables, group_constraints in self.split_components(constraints, variables):
+            if len(group_constraints) < 2:
+                continue
+            column = {variable: k for k, variable in enumerate(group_variables)}
+            rows = []
+            for constraint in group_constraints:
+                row = [0] * (len(group_variables) + 1)
+                for variable in _bits(constraint.mask):
+                    row[column[variable]] = 1
+                row[-1] = constraint.value
+                rows.append(row)
+            for row in _row_reduce(rows):
+                positive = sum(coefficient for coefficient in row[:-1] if coefficient > 0)
+                negative = sum(coefficient for coefficient in row[:-1] if coefficient < 0)
+                if row[-1] == positive:
+                    sign = 1
+                elif row[-1] == negative:
+                    sign = -1
+                else:
+                    continue
+                for k, coefficient in enumerate(row[:-1]):
+                    if coefficient * sign > 0:
+                        bombs |= 1 << group_variables[k]
+                    elif coefficient * sign < 0:
+                        safe |= 1 << group_variables[k]
+        return bombs, safe
+
+    def mine_probabilities(self, constraints, variables, num_unconstrained):
+        """
+        Computes the probability of each constrained tile containing a bomb. Groups of constraints are
+        solved independently and their solution counts are combined, each combination weighted by the number
+        of ways to place the remaining bombs on the unconstrained tiles.
+        A group whose estimate found no solution is left out and its tiles are counted as unconstrained.
+        If the estimated counts leave no way to place the remaining bombs, all estimated groups are left out.
+
+        :param constraints: simplified constraints.
+        :type constraints: list of MinesweeperConstraints.
+        :param variables: indices of the variables associated with constraints.
+        :type variables: list of int.
+        :param num_unconstrained: number of unknown tiles neither constrained nor known to contain a bomb.
+        :type num_unconstrained: int.
+        :return: (probability of each variable containing a bomb,
+            probability of an unconstrained tile containing a bomb, None if there are no such tiles)
+        :rtype: (dictionary, float).
+        """
+        self.estimate_flag = False
+        # The budget is shared by all groups of the move
+        self.nodes_left = self.max_nodes
+        self.deadline = None if self.max_time is None else time.perf_counter() + self.max_time
+        components = []  # Counts of each group and whether they are estimates
+        for group in self.split_components(constraints, variables):
+            estimated = self.estimate_flag
+            self.estimate_flag = False
+            totals, bombs = self.count_solutions(*group)
+            components.append((totals, bombs, self.estimate_flag))
+            self.estimate_flag = self.estimate_flag or estimated
+        num_variables = sum(len(bombs) for _, bombs, _ in components)
+        result = None
+        for exact_only in (False, True):
+            kept = [(totals, bombs) for totals, bombs, estimated in components
+                    if any(totals) and not (exact_only and estimated)]
+            left_out = num_variables - sum(len(bombs) for _, bombs in kept)  # Counted as unconstrained tiles
+            result = self.combine_components(kept, num_unconstrained + left_out)
+            if result is not None:
+                break
+        if result is None:
+            return {}, None
+        probabilities, unconstrained_probability = result
+        for _, bombs, _ in components:
+            for variable in bombs:
+                probabilities.setdefault(variable, unconstrained_probability)
+        if num_unconstrained == 0:
+            unconstrained_probability = None
+        return probabilities, unconstrained_probability
+
+    def combine_components(self, components, num_unconstrained):
+        """
+        Combines the solution counts of independent groups of constraints into probabilities, see
+        mine_probabilities.
+
+        :param components: counts of each group, see count_solutions.
+        :type components: list of tuples (list of int, dictionary of lists of int).
+        :param num_unconstrained: number of unknown tiles outside the groups and not known to contain a bomb.
+        :type num_unconstrained: int.
+        :return: (probability of each variable of the groups containing a bomb,
+            probability of an unconstrained tile containing a bomb, None if there are no such tiles),
+            None if the counts leave no way to place the remaining bombs.
+        :rtype: (dictionary, float).
+        """
+        remaining = self.num_bombs - len(self.bomb_position)
+        max_bombs = sum(len(totals) - 1 for totals, _ in components)
+        weights = [comb(num_unconstrained, remaining - k) if 0 <= remaining - k else 0 for k in range(max_bombs + 1)]
+        # Solution counts of all groups before (prefix) and after (suffix) each group, by number of bombs
+        prefix = [[1]]
+        for totals, _ in components:
+            prefix.append(_convolve(prefix[-1], totals))
+        suffix = [[1]]
+        for totals, _ in reversed(components):
+            suffix.append(_convolve(suffix[-1], totals))
+        suffix.reverse()
+        total = sum(count * weight for count, weight in zip(prefix[-1], weights))
+        if total == 0:
+            return None
+        probabilities = {}
+        for index, (totals, bombs) in enumerate(components):
+            others = _convolve(prefix[index], suffix[index + 1])
+            # Weight of a solution of this group with k bombs, summed over the solutions of all other groups
+            group_weights = [sum(count * weights[k + other] for other, count in enumerate(others))
+                             for k in range(len(totals))]
+            for variable, counts in bombs.items():
+                probabilities[variable] = sum(count * weight for count, weight in zip(counts, group_weights)) / total
+        unconstrained_probability = None
+        if num_unconstrained > 0:
+            unconstrained_bombs = sum(count * comb(num_unconstrained - 1, remaining - k - 1)
+                                      for k, count in enumerate(prefix[-1]) if remaining - k - 1 >= 0)
+            unconstrained_probability = unconstrained_bombs / total
+        return probabilities, unconstrained_probability
+
+    def clear_constraints(self):
+        """
+        Forgets all constraints and frontier variables.
+        """
+        self.constraints = {}  # Constraint ids as keys
+        self.next_constraint = 0
+        self.watchers = {}  # Variables as keys, ids of the constraints containing them as values
+        self.variable_index = {}  # Frontier tiles as keys, their variables as values
+        self.frontier = []  # Tile of each variable, None for free variables
+        self.free_variables = []
+
     def read_board(self, board):
         """
         Reads minesweeper board. Returns simplified constraints and all variables constrained.
+        Variables are indices into self.frontier, the unknown tiles next to an uncovered number.
+        Constraints are kept between calls: only the tiles uncovered since the last board read are
+        processed, unless the board is not a continuation of that board, in which case it is read in full.
 
         :param board: game board.
-        :type board: numpy matrix.
-        :return: (simplified constraints, variables associated with constraints)
-        :rtype: (list of MinesweeperConstraints, list of tuples)
-        """
-        self.constraints = []
-        self.unknown_position = []
-        constrained_var = set()
-        height = board.shape[0]
-        width = board.shape[1]
+        :type board: numpy array.
+        :return: (simplified constraints, indices of the variables associated with constraints)
+        :rtype: (list of MinesweeperConstraints, list of int)
+        """
+        board = np.asarray(board)
+        uncovered = self.uncovered_tiles(board)
+        if uncovered is None:
+            self.clear_constraints()
+            unknown = np.nonzero(board == MinesweeperCore.UNKNOWN_CELL)
+            self.unknown_position = dict.fromkeys(zip(unknown[0].tolist(), unknown[1].tolist()))
+            numbers = np.argwhere(board > 0)
+            queue = []
+        else:
+            numbers = uncovered[board[uncovered[:, 0], uncovered[:, 1]] > 0]
+            queue = self.forget_tiles(uncovered)
+        self.last_board = board.copy()
         # Creates constraints
-        tiles = [(i, j) for i in range(height) for j in range(width)]
-        for tile in tiles:
-            if board[tile] == MinesweeperCore.UNKNOWN_CELL:
-                self.unknown_position.append(tile)
-            elif board[tile] > 0:
-                variables = []
-                neighbors = []
-                for i in [-1, 0, 1]:
-                    for j in [-1, 0, 1]:
-                        neighbor = (tile[0] + i, tile[1] + j)
-                        if neighbor != tile and 0 <= neighbor[0] < height and 0 <= neighbor[1] < width:
-                            neighbors.append(neighbor)
-                for neighbor in neighbors:
-                    if board[neighbor] == MinesweeperCore.UNKNOWN_CELL:
-                        variables.append(neighbor)
-                        constrained_var.add(neighbor)
-                value = board[tile]
-                constraint = MinesweeperConstraint(variables, value)
-                self.constraints.append(constraint)
-        # Simplifies constraints
-        has_subset = True
-        has_simplified_version = True
-        while has_simplified_version:
-            has_simplified_version = False
-            # Removes subsets of constraints
-            while has_subset:
-                has_subset = False
-                for i in range(len(self.constraints)):
-                    for j in range(len(self.constraints)):
-                        if i != j and set(self.constraints[i].variables).issubset(set(self.constraints[j].variables)):
-                            has_subset = True
-                            variables = [var for var in self.constraints[j].variables
-                                         if var not in self.constraints[i].variables]
-                            value = self.constraints[j].value - self.constraints[i].value
-                            self.constraints[j].variables = variables
-                            self.constraints[j].value = value
-                constraints = [constraint for constraint in self.constraints if constraint.variables != []]
-                self.constraints = constraints
-            # Removes known empty tiles
-            for position in self.nobomb_position:
-                for constraint in self.constraints:
-                    if position in constraint.variables:
-                        has_simplified_version = True
-                        constraint.variables.remove(position)
-            # Removes known tiles with bombs
-            for position in self.bomb_position:
-                for constraint in self.constraints:
-                    if position in constraint.variables:
-                        has_simplified_version = True
-                        constraint.variables.remove(position)
-                        constraint.value = constraint.value - 1
-            constraints = [constraint for constraint in self.constraints if constraint.variables != []]
-            self.constraints = constraints
-            # Removes tiles in constraints with value 0 or equal to number of tiles in constraint
-            for constraint in self.constraints:
+        queue += self.add_constraints(board, numbers)
+        return self.learn(queue)
+
+    def learn(self, queue, bombs=0, safe=0):
+        """
+        Simplifies the constraints after a change and records the tiles found to be known.
+
+        :param queue: ids of the new or changed constraints.
+        :type queue: list of int.
+        :param bombs: bitmask of the variables just found to contain a bomb.
+        :type bombs: int.
+        :param safe: bitmask of the variables just found not to contain a bomb.
+        :type safe: int.
+        :return: (simplified constraints, indices of the variables associated with constraints)
+        :rtype: (list of MinesweeperConstraints, list of int)
+        """
+        for variable in _bits(bombs | safe):
+            queue.extend(sorted(self.watchers[variable]))
+        bombs, safe = self.simplify(queue, bombs, safe)
+        self.bomb_position.extend(sorted(self.frontier[variable] for variable in _bits(bombs)))
+        self.nobomb_position.extend(sorted(self.frontier[variable] for variable in _bits(safe)))
+        self.release_variables(bombs | safe)
+        # Trivial contraints are already removed from constrained variables
+        non_trivials_constrained_var = [variable for variable, tile in enumerate(self.frontier) if tile is not None]
+        return list(self.constraints.values()), non_trivials_constrained_var
+
+    def uncovered_tiles(self, board):
+        """
+        Compares the board with the last board read.
+
+        :param board: game board.
+        :type board: numpy array.
+        :return: positions (i, j) of the tiles uncovered since the last board read, in row-major order,
+            None if the board cannot be reached from the last board by uncovering tiles.
+        :rtype: numpy array.
+        """
+        if self.last_board is None or self.last_board.shape != board.shape:
+            return None
+        changed = np.argwhere(board != self.last_board)
+        if np.any(self.last_board[changed[:, 0], changed[:, 1]] != MinesweeperCore.UNKNOWN_CELL):
+            return None
+        return changed
+
+    def forget_tiles(self, uncovered):
+        """
+        Removes uncovered tiles from the unknown tiles and from the constraints.
+
+        :param uncovered: positions (i, j) of the tiles uncovered since the last board read.
+        :type uncovered: numpy array.
+        :return: ids of the changed constraints.
+        :rtype: list of int.
+        """
+        mask = 0
+        for tile in map(tuple, uncovered.tolist()):
+            del self.unknown_position[tile]
+            if tile in self.variable_index:
+                mask |= 1 << self.variable_index[tile]
+        changed = set()
+        for variable in _bits(mask):
+            changed |= self.watchers[variable]
+        for k in changed:
+            self.constraints[k].mask &= ~mask
+        self.release_variables(mask)
+        return sorted(changed)
+
+    def add_constraints(self, board, tiles):
+        """
+        Creates the constraints of uncovered numbers, leaving known tiles out of them.
+        The unknown neighbours of all numbers are gathered at once with array indexing.
+
+        :param board: game board.
+        :type board: numpy array.
+        :param tiles: positions (i, j) of the uncovered numbers, in row-major order.
+        :type tiles: numpy array.
+        :return: ids of the new constraints.
+        :rtype: list of int.
+        """
+        if len(tiles) == 0:
+            return []
+        # Rows and columns of the 9 neighbours of each number, and which of them are unknown tiles on the board
+        rows = tiles[:, 0, None] + NEIGHBOUR_OFFSETS[:, 0]
+        cols = tiles[:, 1, None] + NEIGHBOUR_OFFSETS[:, 1]
+        inside = (rows >= 0) & (rows < board.shape[0]) & (cols >= 0) & (cols < board.shape[1])
+        unknown = inside & (board[rows.clip(0, board.shape[0] - 1), cols.clip(0, board.shape[1] - 1)]
+                            == MinesweeperCore.UNKNOWN_CELL)
+        numbers, offsets = np.nonzero(unknown)
+        neighbours = zip(rows[numbers, offsets].tolist(), cols[numbers, offsets].tolist())
+        values = board[tiles[:, 0], tiles[:, 1]].tolist()
+        masks = [0] * len(tiles)
+        bomb_position = set(self.bomb_position)
+        nobomb_position = set(self.nobomb_position)
+        for index, neighbor in zip(numbers.tolist(), neighbours):
+            if neighbor in nobomb_position:
+                continue
+            if neighbor in bomb_position:
+                values[index] -= 1
+            else:
+                masks[index] |= 1 << self.variable(neighbor)
+        added = []
+        for mask, value in zip(masks, values):
+            if mask == 0:
+                continue
+            k = self.next_constraint
+            self.next_constraint += 1
+            self.constraints[k] = MinesweeperConstraint(mask, value)
+            for variable in _bits(mask):
+                self.watchers[variable].add(k)
+            added.append(k)
+        return added
+
+    def variable(self, tile):
+        """
+        Returns the variable of a frontier tile, allocating one if needed.
+
+        :param tile: position (i, j) of an unknown tile.
+        :type tile: tuple.
+        :return: index of the variable.
+        :rtype: int.
+        """
+        if tile not in self.variable_index:
+            if self.free_variables:
+                variable = self.free_variables.pop()
+                self.frontier[variable] = tile
+            else:
+                variable = len(self.frontier)
+                self.frontier.append(tile)
+            self.variable_index[tile] = variable
+            self.watchers[variable] = set()
+        return self.variable_index[tile]
+
+    def release_variables(self, mask):
+        """
+        Frees the variables of tiles that no constraint contains anymore.
+
+        :param mask: bitmask of the variables.
+        :type mask: int.
+        """
+        for variable in _bits(mask):
+            del self.variable_index[self.frontier[variable]]
+            del self.watchers[variable]
+            self.frontier[variable] = None
+            self.free_variables.append(variable)
+
+    def simplify(self, queue, bombs=0, safe=0):
+        """
+        Simplifies the constraints with a work-list: tiles found to be known are removed from the constraints,
+        constraints that are subsets of others are subtracted from them, and constraints with value 0 or equal
+        to their number of variables reveal new known tiles. Only constraints sharing a variable with a changed
+        constraint are visited again.
+
+        :param queue: ids of the new or changed constraints.
+        :type queue: list of int.
+        :param bombs: bitmask of the variables just found to contain a bomb.
+        :type bombs: int.
+        :param safe: bitmask of the variables just found not to contain a bomb.
+        :type safe: int.
+        :return: (bitmask of the newly known bombs, bitmask of the newly known empty tiles)
+        :rtype: (int, int)
+        """
+        queue = deque(dict.fromkeys(queue))
+        queued = set(queue)
+
+        def push(k):
+            if k not in queued:
+                queued.add(k)
+                queue.append(k)
+
+        def update(k, mask, value):
+            for variable in _bits(self.constraints[k].mask & ~mask):
+                self.watchers[variable].discard(k)
+            self.constraints[k].mask = mask
+            self.constraints[k].value = value
+
+        def remove(k):
+            update(k, 0, 0)
+            del self.constraints[k]
+
+        while queue:
+            k = queue.popleft()
+            queued.discard(k)
+            if k not in self.constraints:
+                continue
+            constraint = self.constraints[k]
+            # Removes known tiles
+            known = constraint.mask & (bombs | safe)
+            if known:
+                update(k, constraint.mask & ~known, constraint.value - _popcount(constraint.mask & bombs))
+            # Removes constraints with value 0 or equal to number of tiles in constraint
+            if constraint.value == 0 or constraint.value == _popcount(constraint.mask):
+                revealed = constraint.mask
                 if constraint.value == 0:
-                    has_simplified_version = True
-                    for variable in constraint.variables:
-                        self.nobomb_position.append(variable)
-                    constraints.remove(constraint)
-                elif constraint.value == len(constraint.variables):
-                    has_simplified_version = True
-                    for variable in constraint.variables:
-                        self.bomb_position.append(variable)
-                    constraints.remove(constraint)
-            self.constraints = constraints
-            for i in range(len(self.constraints)):
-                for j in range(len(self.constraints)):
-                    if i != j and set(self.constraints[i].variables).issubset(set(self.constraints[j].variables)):
-                        has_simplified_version = True
-                        has_subset = True
-        # Removes trivial contraints from constrained_var
-        non_trivials_constrained_var = []
-        for variable in constrained_var:
-            if variable not in self.bomb_position and variable not in self.nobomb_position:
-                non_trivials_constrained_var.append(variable)
-        return self.constraints, non_trivials_constrained_var
+                    safe |= revealed
+                else:
+                    bombs |= revealed
+                remove(k)
+                for variable in _bits(revealed):
+                    for other in self.watchers[variable]:
+                        push(other)
+                continue
+            # Removes subsets of constraints
+            others = set()
+            for variable in _bits(constraint.mask):
+                others |= self.watchers[variable]
+            others.discard(k)
+            for other in sorted(others):
+                if other not in self.constraints:
+                    continue
+                other_constraint = self.constraints[other]
+                if constraint.mask & ~other_constraint.mask == 0:
+                    if constraint.mask == other_constraint.mask:
+                        remove(other)
+                    else:
+                        update(other, other_constraint.mask & ~constraint.mask,
+                               other_constraint.value - constraint.value)
+                        push(other)
+                elif other_constraint.mask & ~constraint.mask == 0:
+                    update(k, constraint.mask & ~other_constraint.mask, constraint.value - other_constraint.value)
+                    push(k)
+                    break
+        return bombs, safe
@@ -0,0 +1,38 @@
+import numpy as np
+from minesweeper import MinesweeperCore
+from agents.abstract_agent import AbstractAgent
+
+
+class RandomAgent (AbstractAgent):
+    """
+    Plays on a random unknown tile. Useful as a baseline policy.
+    """
+    def __init__(self, seed=None):
+        """
+        Initializes the random agent.
+
+        :param seed: seed or generator of the random stream used to choose the tiles.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        """
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, seed=None):
+        """
+        Resets agent.
+
+        :param seed: if given, restarts the random stream used to choose the tiles from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+    def act(self, board):
+        """
+        Returns a random unknown position (i, j) to play.
+
+        :param board: game board.
+        :type board: numpy array.
+        """
+        unknown = np.argwhere(board == MinesweeperCore.UNKNOWN_CELL)
+        i, j = unknown[self.rng.integers(len(unknown))]
+        return int(i), int(j)
@@ -0,0 +1,122 @@
+import importlib
+import inspect
+import os
+
+# Builds agents by name. Each agent's module is imported only when that agent is built,
+# so CSP or random runs, and the worker processes they spawn, never load TensorFlow.
+# Besides the registered names, any AbstractAgent subclass can be built from its 'module:Class' path,
+# e.g. 'agents.csp:MinesweeperAgent'.
+
+L4MS_WEIGHTS = 'results/best_model.hdf5'
+
+
+def _csp_agent(size, bombs, seed=None, **params):
+    """
+    Builds a CSP agent, see agents.csp.MinesweeperAgent for its parameters.
+    """
+    from agents.csp import MinesweeperAgent
+    return MinesweeperAgent(size, bombs, seed=seed, **params)
+
+
+def _random_agent(size, bombs, seed=None):
+    """
+    Builds a random agent, which plays on any board.
+    """
+    from agents.random_agent import RandomAgent
+    return RandomAgent(seed)
+
+
+def _l4ms_agent(size, bombs, seed=None, weights=L4MS_WEIGHTS, **params):
+    """
+    Builds an L4MS agent, see agents.L4MSAgent.L4MSAgent for its parameters, and loads its weights if they exist.
+    """
+    from agents.L4MSAgent import L4MSAgent
+    agent = L4MSAgent(size, seed=seed, **params)
+    if os.path.exists(weights):
+        print('Loading weights from previous learning session.')
+        agent.load(weights)
+    else:
+        print('No weights found from previous learning session.')
+    return agent
+
+
+# Factory and default parameters of each agent
+AGENTS = {
+    'h_csp': (_csp_agent, {'heuristic': True}),
+    'nh_csp': (_csp_agent, {'heuristic': False}),
+    'random': (_random_agent, {}),
+    'l4ms': (_l4ms_agent, {}),
+}
+
+
+def agent_class(path):
+    """
+    Imports an agent class from its path.
+
+    :param path: 'module:Class' path, e.g. 'agents.random_agent:RandomAgent'.
+    :type path: str.
+    :return: agent class.
+    :rtype: subclass of AbstractAgent.
+    """
+    from agents.abstract_agent import AbstractAgent
+    module_name, _, class_name = path.partition(':')
+    agent = getattr(importlib.import_module(module_name), class_name, None)
+    if not (inspect.isclass(agent) and issubclass(agent, AbstractAgent)):
+        raise ValueError("Not an agent class: " + path)
+    return agent
+
+
+def _class_agent(agent, size, bombs, seed=None, **params):
+    """
+    Builds an agent from its class, giving the board size, the number of bombs and the seed to the constructor
+    parameters with the names used by this repository's agents, when it has them.
+    """
+    parameters = inspect.signature(agent).parameters
+    arguments = {}
+    for names, value in ((('size', 'side'), size), (('num_bombs', 'bombs'), bombs), (('seed',), seed)):
+        name = next((name for name in names if name in parameters), None)
+        if name is not None:
+            arguments[name] = value
+    return agent(**arguments, **params)
+
+
+def register_agent(agent_name, factory, **defaults):
+    """
+    Makes an agent available by name.
+
+    :param agent_name: name of the agent.
+    :type agent_name: str.
+    :param factory: function building the agent from the board size, the number of bombs, a seed and parameters.
+        It should import the agent's module itself, so the module is only loaded when the agent is used.
+    :type factory: function.
+    :param defaults: default parameters given to the factory.
+    :type defaults: dictionary.
+    """
+    AGENTS[agent_name] = (factory, defaults)
+
+
+def build_agent(agent_name, size, bombs, seed=None, **params):
+    """
+    Builds an agent by name.
+
+    :param agent_name: h_csp (heuristic csp), nh_csp (non-heuristic csp), l4ms, random, any registered name
+        or the 'module:Class' path of an agent class.
+    :type agent_name: str.
+    :param size: length of one side of the board.
+    :type size: int.
+    :param bombs: number of bombs on the board.
+    :type bombs: int.
+    :param seed: seed or generator of the agent's random stream.
+    :type seed: int, numpy SeedSequence or numpy Generator.
+    :param params: parameters of the agent, overriding its defaults, e.g. weights for l4ms.
+    :type params: dictionary.
+    :return: agent.
+    :rtype: AbstractAgent.
+    """
+    if agent_name in AGENTS:
+        factory, defaults = AGENTS[agent_name]
+    elif ':' in agent_name:
+        return _class_agent(agent_class(agent_name), size, bombs, seed, **params)
+    else:
+        raise ValueError("Unknown agent: " + agent_name)
+    return factory(size, bombs, seed, **dict(defaults, **params))
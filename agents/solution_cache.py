@@ -0,0 +1,131 @@
+import os
+import pickle
+from collections import OrderedDict
+
+# The 8 symmetries of the square grid, as (swap rows and columns, row sign, column sign)
+SYMMETRIES = [(False, 1, 1), (False, 1, -1), (False, -1, 1), (False, -1, -1),
+              (True, 1, 1), (True, 1, -1), (True, -1, 1), (True, -1, -1)]
+
+
+class SolutionCache:
+    """
+    Least-recently-used cache of the solutions of groups of constraints, shareable between agents and episodes.
+    Groups are identified by a canonical key: tile coordinates relative to the group's corner, optionally taking
+    the smallest key among all rotations and reflections of the group, so that the same local configuration found
+    anywhere on any board is only solved once.
+    """
+    def __init__(self, max_size=100000, symmetry=True, min_variables=10):
+        """
+        Initializes an empty cache.
+
+        :param max_size: maximum number of cached groups, 0 disables the cache.
+        :type max_size: int.
+        :param symmetry: whether rotated or reflected groups share the same entry.
+        :type symmetry: bool.
+        :param min_variables: smallest group that is cached. Smaller groups are cheaper to solve than to key.
+        :type min_variables: int.
+        """
+        self.max_size = max_size
+        self.symmetry = symmetry
+        self.min_variables = min_variables
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def caches(self, num_variables):
+        """
+        Tells if groups with the given number of variables are looked up and stored.
+
+        :param num_variables: number of variables of the group.
+        :type num_variables: int.
+        :return: cached group size flag.
+        :rtype: bool.
+        """
+        return self.max_size > 0 and num_variables >= self.min_variables
+
+    def key(self, tiles, constraints):
+        """
+        Computes the canonical key of a group of constraints.
+
+        :param tiles: tile (i, j) of each variable of the group.
+        :type tiles: list of tuples.
+        :param constraints: positions in tiles of the variables of each constraint, and its value.
+        :type constraints: list of tuples (list of int, int).
+        :return: (canonical key, canonical index of each variable)
+        :rtype: (tuple, list of int).
+        """
+        best = None
+        for swap, row_sign, column_sign in (SYMMETRIES if self.symmetry else SYMMETRIES[:1]):
+            coordinates = [(row_sign * j, column_sign * i) if swap else (row_sign * i, column_sign * j)
+                           for i, j in tiles]
+            top = min(i for i, _ in coordinates)
+            left = min(j for _, j in coordinates)
+            coordinates = [(i - top, j - left) for i, j in coordinates]
+            ranking = sorted(range(len(coordinates)), key=coordinates.__getitem__)
+            order = [0] * len(coordinates)
+            for rank, k in enumerate(ranking):
+                order[k] = rank
+            key = (tuple(sorted(coordinates)),
+                   tuple(sorted((tuple(sorted(order[k] for k in variables)), value)
+                                for variables, value in constraints)))
+            if best is None or key < best[0]:
+                best = (key, order)
+        return best
+
+    def get(self, key):
+        """
+        Looks a group up, counting hits and misses.
+
+        :param key: canonical key of the group.
+        :type key: tuple.
+        :return: cached solutions, None if the group is not cached.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Stores the solutions of a group, evicting the least recently used groups when the cache is full.
+
+        :param key: canonical key of the group.
+        :type key: tuple.
+        :param value: solutions of the group.
+        """
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def save(self, name):
+        """
+        Saves the cached groups to disk.
+
+        :param name: file name.
+        :type name: str.
+        """
+        with open(name, 'wb') as file:
+            pickle.dump((self.symmetry, list(self.entries.items())), file)
+
+    def load(self, name):
+        """
+        Loads groups saved by save, if the file exists and was saved with the same symmetry setting.
+
+        :param name: file name.
+        :type name: str.
+        """
+        if not os.path.exists(name):
+            return
+        with open(name, 'rb') as file:
+            symmetry, entries = pickle.load(file)
+        if symmetry == self.symmetry:
+            for key, value in entries:
+                self.put(key, value)
@@ -0,0 +1,43 @@
+import time
+import numpy as np
+from minesweeper_environment import MinesweeperEnvironment
+from agents.csp import MinesweeperAgent
+from agents.solution_cache import SolutionCache
+from evaluation import play_episode
+from seeding import episode_seeds
+
+# This script compares configurations of the CSP agent on the same seeded boards.
+# For each board size it reports the win rate, the number of CSPSolver searches per game,
+# the time per game and the hit rate of the solution cache.
+
+NUM_EPISODES = 200
+SEED = 0
+boards = [(8, 10), (16, 40)]  # (size, bombs)
+configurations = {
+    'subset rules only': {'gaussian_elimination': False, 'cache': SolutionCache(max_size=0)},
+    'gaussian elimination': {'gaussian_elimination': True, 'cache': SolutionCache(max_size=0)},
+    'elimination and cache': {'gaussian_elimination': True, 'cache': SolutionCache()},
+    'cache from 1 tile': {'gaussian_elimination': True, 'cache': SolutionCache(min_variables=1)},
+    'node budget of 200': {'gaussian_elimination': True, 'cache': SolutionCache(max_size=0), 'max_nodes': 200},
+    'sampled above 10 tiles': {'gaussian_elimination': True, 'cache': SolutionCache(max_size=0),
+                               'max_exact_variables': 10},
+}
+
+if __name__ == '__main__':
+    for size, bombs in boards:
+        print('Board', size, 'x', size, 'with', bombs, 'bombs')
+        for name, parameters in configurations.items():
+            game = MinesweeperEnvironment(size, size, bombs)
+            cache = parameters['cache']
+            cache.entries.clear()  # Each board starts with an empty cache and its own hit rate
+            cache.hits = cache.misses = 0
+            agent = MinesweeperAgent(size, bombs, **parameters)
+            start = time.time()
+            results = [play_episode(agent, game, game_seed, agent_seed)
+                       for game_seed, agent_seed in episode_seeds(SEED, NUM_EPISODES)]
+            elapsed = time.time() - start
+            victories = np.mean([result['victory'] for result in results]) * 100
+            lookups = max(agent.cache.hits + agent.cache.misses, 1)
+            print('  %-24s win rate: %5.1f %%  searches per game: %6.2f  ms per game: %7.2f  cache hits: %5.1f %%'
+                  % (name, victories, agent.num_searches / NUM_EPISODES, 1000 * elapsed / NUM_EPISODES,
+                     100 * agent.cache.hits / lookups))
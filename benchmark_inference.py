@@ -0,0 +1,68 @@
+import os
+import time
+import numpy as np
+from minesweeper_environment import MinesweeperEnvironment
+from agents.csp import MinesweeperAgent
+from agents.L4MSAgent import L4MSAgent
+
+# Comment this line to benchmark on your GPU. Evaluation machines are CPU-only.
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+# This script compares the inference paths of the L4MS agent on CPU.
+# For each path it reports the latency of scoring a single board, the throughput of scoring batches
+# of boards, and the largest difference from the output of Keras' predict.
+
+SIDE = 8
+BOMBS = 10
+WEIGHTS = 'results/best_model.hdf5'
+NUM_BOARDS = 256
+REPEATS = 200
+paths = ['predict', 'function', 'numpy']
+
+
+def sample_boards(num_boards, seed=0):
+    """
+    Collects boards from games played by the CSP agent.
+    """
+    game = MinesweeperEnvironment(SIDE, SIDE, BOMBS, seed=seed)
+    agent = MinesweeperAgent(SIDE, BOMBS, seed=seed)
+    boards = []
+    while len(boards) < num_boards:
+        boards.append(np.array(game.get_state()))
+        _, _, done = game.step(*agent.act(game.get_state()))
+        if done:
+            game.reset()
+            agent.reset()
+    return np.stack(boards)
+
+
+def timed(function, repeats):
+    """
+    Returns the median time of a call in milliseconds.
+    """
+    function()  # Warm up, e.g. tracing
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+if __name__ == '__main__':
+    agent = L4MSAgent(SIDE)
+    if os.path.exists(WEIGHTS):
+        agent.load(WEIGHTS)
+    else:
+        print('No weights found, timing random weights.')
+    boards = agent.adjust_shape(sample_boards(NUM_BOARDS))
+    single = boards[:1]
+    reference = agent.model.predict(boards)
+    print('%-13s single board: %8.3f ms' % ('model.predict', timed(lambda: agent.model.predict(single), REPEATS)))
+    for path in paths:
+        agent.compile_inference(path)
+        latency = timed(lambda: agent.forward(single), REPEATS)
+        batch = timed(lambda: agent.forward(boards), max(REPEATS // 10, 1))
+        error = np.abs(np.asarray(agent.forward(boards)) - reference).max()
+        print('%-13s single board: %8.3f ms  batch of %d: %8.3f ms (%8.0f boards/s)  max difference: %.2e'
+              % (path, latency, NUM_BOARDS, batch, 1000 * NUM_BOARDS / batch, error))
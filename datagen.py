@@ -1,48 +1,63 @@
-from minesweeper import MinesweeperCore
+from multiprocessing import Pool
 from minesweeper_environment import MinesweeperEnvironment
-from agents.csp import MinesweeperAgent
-import numpy as np
-import os
+from dataset_writer import DatasetWriter, write_manifest
+from agents.registry import build_agent
+from seeding import spawn_seeds
 
 # This file creates the dataset used in supervised learning.
 # The Dataset consists of mappings of X to Y where X is the input of game states
 # and Y is the output expected position to play on the minesweeper board for each game state.
+# With several workers, each process plays its own seeded games and writes its own shards,
+# and a manifest describing all shards is written at the end.
 
 # Dataset configuration
 batch_size = 5000
 dataset_size = 5000000
 folder_name = 'dataset'
+seed = 0  # Combined with the worker and its first batch number, so resumed runs do not repeat earlier batches
+workers = 1  # Number of worker processes. Keep the same number when resuming a dataset
 
 # Game/Actor Configuration
 side = 8
 bombs = 10
-actor = MinesweeperAgent(side, bombs)
-minesweeper = MinesweeperEnvironment(side, side, bombs)
-
-batch = len([name for name in os.listdir(folder_name) if
-             os.path.isfile(os.path.join(folder_name, name))]) // 2  # number of already existent dataset files
-
-# Dataset initialization.
-X = np.array([minesweeper.get_state()])
-Y = np.array(np.zeros((1, side * side)))
-
-for k in range(1, dataset_size + 1):
-    state = minesweeper.get_state()
-    X = np.concatenate([X, np.copy(state).reshape(1, side, side)])
-    i, j = actor.act(state)
-    next_state, reward, done = minesweeper.step(i, j)
-    vector = np.zeros((1, side * side))
-    vector[0, i * side + j] = 1
-    Y = np.concatenate([Y, vector])
-    if k % 1000 == 0:
-        print('%s thousand done' % int(k / 1000))
-    if k % batch_size == 0:
-        X = np.expand_dims(X, axis=0).reshape(-1, side, side, 1)
-        np.save(folder_name + '/dataset_X_' + str(batch), X[1:])
-        np.save(folder_name + '/dataset_Y_' + str(batch), Y[1:])
-        X = np.array([minesweeper.get_state()])
-        Y = np.array(np.zeros((1, side * side)))
-        batch += 1
-    if done:
-        minesweeper.reset()
-        actor.reset()
+agent_name = 'h_csp'  # h_csp (heuristic csp), nh_csp (non-heuristic csp) or random
+
+
+def generate(worker):
+    """
+    Plays games and writes the worker's share of the dataset, resuming after its already existent dataset files.
+
+    :param worker: number of the worker.
+    :type worker: int.
+    :return: number of samples written by the worker.
+    :rtype: int.
+    """
+    share = dataset_size // workers + (worker < dataset_size % workers)
+    writer = DatasetWriter(folder_name, side, batch_size, worker=worker if workers > 1 else None)
+    game_seed, actor_seed = spawn_seeds((seed, worker, writer.shard), 2)
+    actor = build_agent(agent_name, side, bombs)
+    actor.reset(actor_seed)
+    minesweeper = MinesweeperEnvironment(side, side, bombs, seed=game_seed)
+    while writer.num_samples < share:
+        state = minesweeper.get_state()
+        i, j = actor.act(state)
+        writer.add(state, i, j)
+        next_state, reward, done = minesweeper.step(i, j)
+        if writer.num_samples % 1000 == 0:
+            print('Worker %d: %s thousand done' % (worker, int(writer.num_samples / 1000)))
+        if done:
+            minesweeper.reset()
+            actor.reset()
+    writer.close()
+    return writer.num_samples
+
+
+if __name__ == '__main__':
+    if workers == 1:
+        generate(0)
+    else:
+        with Pool(workers) as pool:
+            pool.map(generate, range(workers))
+    manifest = write_manifest(folder_name, {'side': side, 'bombs': bombs, 'agent': agent_name, 'seed': seed,
+                                            'batch_size': batch_size, 'workers': workers})
+    print('%d samples in %d files' % (manifest['num_samples'], len(manifest['shards'])))
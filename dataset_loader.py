@@ -0,0 +1,92 @@
+import os
+import numpy as np
+
+# Reads the preprocessed dataset (see preprocess_dataset.py) without loading it in memory.
+# dataset_X.npy holds int8 boards of shape (samples, side, side) and dataset_Y.npy the index i * side + j
+# of the tile played on each board, or the distribution of the tiles played with shape (samples, side * side).
+# Both are memory-mapped, so only the batches being used are read from disk.
+
+
+class DatasetLoader:
+    """
+    Streams shuffled batches of normalized boards and targets from the memory-mapped dataset.
+    """
+    def __init__(self, folder='dataset', batch_size=128, indices=None, seed=None, prefix='dataset'):
+        """
+        Opens the dataset.
+
+        :param folder: folder of the preprocessed dataset.
+        :type folder: str.
+        :param batch_size: number of samples per batch.
+        :type batch_size: int.
+        :param indices: indices of the samples used by this loader. None uses every sample.
+        :type indices: numpy array.
+        :param seed: seed or generator of the random stream used to shuffle the samples.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :param prefix: prefix of the dataset file names.
+        :type prefix: str.
+        """
+        self.folder = folder
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.boards = np.load(os.path.join(folder, prefix + '_X.npy'), mmap_mode='r')
+        self.labels = np.load(os.path.join(folder, prefix + '_Y.npy'), mmap_mode='r')
+        self.side = self.boards.shape[1]
+        if indices is None:
+            indices = np.arange(len(self.boards), dtype=np.min_scalar_type(len(self.boards)))
+        self.indices = indices
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        """
+        Returns the number of full batches in one epoch.
+
+        :return: number of batches.
+        :rtype: int.
+        """
+        return len(self.indices) // self.batch_size
+
+    def split(self, fraction):
+        """
+        Splits the samples at random into two loaders over the same files, e.g. for cross-validation.
+
+        :param fraction: fraction of the samples given to the second loader.
+        :type fraction: float.
+        :return: (loader with the remaining samples, loader with the given fraction of the samples)
+        :rtype: (DatasetLoader, DatasetLoader).
+        """
+        indices = self.rng.permutation(self.indices)
+        size = int(round(len(indices) * fraction))
+        return (DatasetLoader(self.folder, self.batch_size, np.sort(indices[size:]), self.rng, self.prefix),
+                DatasetLoader(self.folder, self.batch_size, np.sort(indices[:size]), self.rng, self.prefix))
+
+    def batch(self, indices):
+        """
+        Reads and normalizes the samples with the given indices.
+
+        :param indices: indices of the samples.
+        :type indices: numpy array.
+        :return: (boards with shape (samples, side, side, 1) normalized to [0, 1],
+            one-hot or soft targets with shape (samples, side * side))
+        :rtype: (numpy array of float32, numpy array of float32).
+        """
+        indices = np.sort(indices)  # Reads the memory-mapped files in order
+        features = (self.boards[indices].astype(np.float32) + 1) / 10.0
+        if self.labels.ndim == 2:
+            targets = self.labels[indices].astype(np.float32)
+        else:
+            targets = np.zeros((len(indices), self.side * self.side), dtype=np.float32)
+            targets[np.arange(len(indices)), self.labels[indices]] = 1
+        return features.reshape(-1, self.side, self.side, 1), targets
+
+    def batches(self):
+        """
+        Yields batches forever, shuffling the samples at the start of each epoch, as expected by Keras' fit.
+
+        :return: batches, see batch.
+        :rtype: generator of tuples (numpy array, numpy array).
+        """
+        while True:
+            order = self.rng.permutation(self.indices)
+            for k in range(len(self)):
+                yield self.batch(order[k * self.batch_size:(k + 1) * self.batch_size])
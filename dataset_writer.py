@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import numpy as np
+
+# Writes the supervised learning dataset as fixed-size shards.
+# Each shard is a pair of files: dataset_X_<n>.npy with int8 boards of shape (samples, side, side)
+# and dataset_Y_<n>.npy with the index i * side + j of the tile played on each board.
+# Shards of parallel workers are named dataset_X_w<worker>_<n>.npy and dataset_Y_w<worker>_<n>.npy.
+
+
+class DatasetWriter:
+    """
+    Buffers board-action pairs in preallocated arrays and flushes them to disk one shard at a time.
+    """
+    def __init__(self, folder, side, shard_size=5000, prefix='dataset', worker=None):
+        """
+        Initializes the writer, resuming after the shards already complete in the folder.
+
+        :param folder: folder where the shards are written.
+        :type folder: str.
+        :param side: length of one side of the board.
+        :type side: int.
+        :param shard_size: number of samples per shard.
+        :type shard_size: int.
+        :param prefix: prefix of the shard file names.
+        :type prefix: str.
+        :param worker: number of the worker writing the shards, so that parallel writers never share a file name.
+            None when a single writer fills the folder.
+        :type worker: int.
+        """
+        self.folder = folder
+        self.side = side
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.tag = '' if worker is None else 'w%d_' % worker
+        os.makedirs(folder, exist_ok=True)
+        self.boards = np.empty((shard_size, side, side), dtype=np.int8)
+        self.actions = np.empty(shard_size, dtype=np.min_scalar_type(side * side - 1))
+        self.num_buffered = 0
+        self.shard, self.num_samples = self.scan()
+
+    def shard_path(self, kind, shard):
+        """
+        Returns the path of a shard file.
+
+        :param kind: 'X' for boards or 'Y' for actions.
+        :type kind: str.
+        :param shard: shard number.
+        :type shard: int.
+        :return: path of the file.
+        :rtype: str.
+        """
+        return os.path.join(self.folder, '%s_%s_%s%d.npy' % (self.prefix, kind, self.tag, shard))
+
+    def scan(self):
+        """
+        Finds the shards already written. A shard counts only when both of its files exist, so a run
+        interrupted while flushing is resumed by writing that shard again.
+
+        :return: (number of the next shard, number of samples in the complete shards)
+        :rtype: (int, int).
+        """
+        pattern = re.compile(re.escape(self.prefix + '_Y_' + self.tag) + r'(\d+)\.npy$')
+        shards = [int(match.group(1)) for match in map(pattern.match, os.listdir(self.folder)) if match]
+        complete = [shard for shard in shards if os.path.exists(self.shard_path('X', shard))]
+        num_samples = sum(len(np.load(self.shard_path('Y', shard), mmap_mode='r')) for shard in complete)
+        return max(complete, default=-1) + 1, num_samples
+
+    def add(self, board, i, j):
+        """
+        Adds a board and the position played on it, flushing the shard when it is full.
+
+        :param board: game board.
+        :type board: numpy array.
+        :param i: row of the tile played.
+        :type i: int.
+        :param j: column of the tile played.
+        :type j: int.
+        """
+        self.boards[self.num_buffered] = board
+        self.actions[self.num_buffered] = i * self.side + j
+        self.num_buffered += 1
+        self.num_samples += 1
+        if self.num_buffered == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered samples as a new shard. Files are written under a temporary name and
+        renamed, so an interrupted run never leaves a truncated shard behind.
+        """
+        if self.num_buffered == 0:
+            return
+        for kind, data in (('X', self.boards), ('Y', self.actions)):
+            path = self.shard_path(kind, self.shard)
+            with open(path + '.tmp', 'wb') as file:
+                np.save(file, data[:self.num_buffered])
+            os.replace(path + '.tmp', path)
+        self.shard += 1
+        self.num_buffered = 0
+
+    def close(self):
+        """
+        Flushes the remaining samples.
+        """
+        self.flush()
+
+
+def write_manifest(folder, config, prefix='dataset'):
+    """
+    Describes every complete shard of a folder, of any worker, in folder/manifest.json
+    together with the configuration used to generate them.
+
+    :param folder: folder of the shards.
+    :type folder: str.
+    :param config: generation configuration, e.g. side, bombs and agent.
+    :type config: dictionary.
+    :param prefix: prefix of the shard file names.
+    :type prefix: str.
+    :return: manifest.
+    :rtype: dictionary.
+    """
+    pattern = re.compile(re.escape(prefix) + r'_Y_((?:w\d+_)?\d+)\.npy$')
+    names = [name for name in os.listdir(folder) if pattern.match(name)]
+    shards = []
+    for name in sorted(names, key=lambda name: [int(number) for number in re.findall(r'\d+', name)]):
+        boards = '%s_X_%s.npy' % (prefix, pattern.match(name).group(1))
+        if os.path.exists(os.path.join(folder, boards)):
+            samples = len(np.load(os.path.join(folder, name), mmap_mode='r'))
+            shards.append({'X': boards, 'Y': name, 'samples': samples})
+    manifest = dict(config, num_samples=sum(shard['samples'] for shard in shards), shards=shards)
+    path = os.path.join(folder, 'manifest.json')
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(path + '.tmp', path)
+    return manifest
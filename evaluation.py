@@ -0,0 +1,358 @@
+import argparse
+import ast
+import csv
+import json
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+from minesweeper_environment import MinesweeperEnvironment
+from agents.registry import AGENTS, build_agent
+from seeding import episode_seeds
+
+# Evaluation API and command line interface. Episodes are spread across a pool of worker processes,
+# each one building its own agent and game, and every episode is played on its own seeded board,
+# so results are identical whatever the number of workers.
+# Agents with act_batch (l4ms) can also play many games at once, choosing the moves of all of them in one call.
+# Agents are built through agents/registry.py, so only the selected agent's module is imported.
+# The command line evaluates every pair of the given board sizes and numbers of bombs, and can write
+# one row of results per pair as JSON or CSV, and save histograms, without a display.
+#
+# Usage:
+#     python evaluation.py --agent h_csp --size 8 --bombs 10 --episodes 1000 --workers 8
+#     python evaluation.py --agent h_csp --size 8 --bombs 8 10 12 --output results.json --plots results/plots
+#     python evaluation.py --agent h_csp --param max_nodes=200 --size 8 16 --bombs 10 40 --output results.csv
+#     python evaluation.py --agent agents.random_agent:RandomAgent --episodes 100
+#     python evaluation.py --agent l4ms --episodes 1000 --workers 1 --batch-size 256
+
+#  Comment this line to enable running using your GPU
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+
+def play_episode(agent, game, game_seed=None, agent_seed=None):
+    """
+    Plays one episode and returns its metrics.
+
+    :param agent: agent playing the episode.
+    :type agent: AbstractAgent.
+    :param game: game environment.
+    :type game: MinesweeperEnvironment.
+    :param game_seed: seed of the board.
+    :type game_seed: numpy SeedSequence.
+    :param agent_seed: seed of the agent's random guesses.
+    :type agent_seed: numpy SeedSequence.
+    :return: victory flag, open percentage, number of plays, open percentage after the
+        last guessed move and number of wrong plays (plays on already open tiles).
+    :rtype: dictionary.
+    """
+    game.reset(game_seed)
+    agent.reset(agent_seed)
+    wrong_plays = getattr(agent, 'num_incorretas', 0)
+    plays = 0
+    guess_percentage = 0
+    while not game.is_finished():
+        action = agent.act(game.get_state())
+        game.step(action[0], action[1])
+        if getattr(agent, 'guess_flag', False):
+            guess_percentage = game.get_open_percentage() * 100
+        plays += 1
+    return {'victory': bool(game.is_victory()),
+            'open_percentage': game.get_open_percentage() * 100,
+            'plays': plays,
+            'guess_percentage': guess_percentage,
+            'wrong_plays': getattr(agent, 'num_incorretas', 0) - wrong_plays}
+
+
+def play_episodes(agent, games, seeds):
+    """
+    Plays one episode per pair of seeds on a pool of games running at the same time. On every step the agent
+    chooses the moves of all running games with a single act_batch call, and a finished game starts the next
+    episode. Boards are the same as with play_episode; the agent is reset once, with the first agent seed.
+
+    :param agent: agent with an act_batch method.
+    :type agent: AbstractAgent.
+    :param games: game environments, as many as the episodes played at once.
+    :type games: list of MinesweeperEnvironment.
+    :param seeds: game and agent seeds of each episode.
+    :type seeds: list of tuples (numpy SeedSequence, numpy SeedSequence).
+    :return: metrics of each episode in seeds order, see play_episode.
+    :rtype: list of dictionaries.
+    """
+    if not hasattr(agent, 'act_batch'):
+        raise ValueError("Agent cannot play games in batches: " + type(agent).__name__)
+    results = [None] * len(seeds)
+    if len(seeds) == 0:
+        return results
+    agent.reset(seeds[0][1])
+    episodes = iter(range(len(seeds)))
+    running = {}  # Index of each running game as keys, [episode, plays, wrong plays] as values
+
+    def start(slot):
+        episode = next(episodes, None)
+        if episode is not None:
+            games[slot].reset(seeds[episode][0])
+            running[slot] = [episode, 0, 0]
+
+    for slot in range(len(games)):
+        start(slot)
+    while running:
+        slots = list(running)
+        rows, columns = agent.act_batch(np.stack([games[slot].get_state() for slot in slots]))
+        wrong_plays = getattr(agent, 'last_incorrect', np.zeros(len(slots), dtype=int))
+        for slot, i, j, wrong in zip(slots, rows.tolist(), columns.tolist(), wrong_plays.tolist()):
+            game = games[slot]
+            game.step(i, j)
+            running[slot][1] += 1
+            running[slot][2] += wrong
+            if game.is_finished():
+                episode, plays, wrong = running.pop(slot)
+                results[episode] = {'victory': bool(game.is_victory()),
+                                    'open_percentage': game.get_open_percentage() * 100,
+                                    'plays': plays,
+                                    'guess_percentage': 0,
+                                    'wrong_plays': wrong}
+                start(slot)
+    return results
+
+
+_worker = {}
+
+
+def _init_worker(agent_name, size, bombs, params, batch_size=1):
+    """
+    Builds the agent and the games of a worker process once, before it plays its episodes.
+    """
+    _worker['agent'] = build_agent(agent_name, size, bombs, **params)
+    _worker['games'] = [MinesweeperEnvironment(size, size, bombs) for _ in range(batch_size)]
+
+
+def _play_worker_episode(seeds):
+    """
+    Plays one episode with the agent and the game of the current worker process.
+    """
+    return play_episode(_worker['agent'], _worker['games'][0], seeds[0], seeds[1])
+
+
+def _play_worker_episodes(seeds):
+    """
+    Plays a group of episodes at once with the agent and the games of the current worker process.
+    """
+    return play_episodes(_worker['agent'], _worker['games'], seeds)
+
+
+def evaluate(agent_name, size, bombs, num_episodes, seed=0, workers=None, params=None, batch_size=1):
+    """
+    Plays num_episodes episodes, spread across worker processes, and yields their metrics in episode order
+    as they become available.
+
+    :param agent_name: name of the agent, see agents.registry.build_agent.
+    :type agent_name: str.
+    :param size: length of one side of the board.
+    :type size: int.
+    :param bombs: number of bombs on the board.
+    :type bombs: int.
+    :param num_episodes: number of episodes.
+    :type num_episodes: int.
+    :param seed: root seed of the evaluation. None for a different run every time.
+    :type seed: int, numpy SeedSequence or None.
+    :param workers: number of worker processes. None uses every core, 1 plays in the current process.
+    :type workers: int.
+    :param params: parameters of the agent, see agents.registry.build_agent.
+    :type params: dictionary.
+    :param batch_size: number of games each worker plays at once, for agents with act_batch. 1 plays one at a time.
+    :type batch_size: int.
+    :return: metrics of each episode, see play_episode.
+    :rtype: generator of dictionaries.
+    """
+    seeds = episode_seeds(seed, num_episodes)
+    if workers is None:
+        workers = os.cpu_count()
+    if batch_size > 1:
+        # Each task is a group of episodes, big enough to keep the games of a worker busy
+        group_size = batch_size * 4
+        tasks = [seeds[start:start + group_size] for start in range(0, num_episodes, group_size)]
+        play, chunksize = _play_worker_episodes, 1
+    else:
+        tasks = seeds
+        play, chunksize = _play_worker_episode, max(1, num_episodes // (workers * 8))
+    initargs = (agent_name, size, bombs, params or {}, batch_size)
+    if workers == 1:
+        _init_worker(*initargs)
+        for result in map(play, tasks):
+            yield from (result if batch_size > 1 else [result])
+        return
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for result in pool.imap(play, tasks, chunksize):
+            yield from (result if batch_size > 1 else [result])
+
+
+def summarize(results):
+    """
+    Aggregates the metrics of many episodes.
+
+    :param results: metrics of each episode, see play_episode.
+    :type results: list of dictionaries.
+    :return: victory percentage, mean and standard deviation of the open percentage, of the number of plays
+        until defeat and of the open percentage after the last guess in won games, and wrong plays percentage.
+    :rtype: dictionary.
+    """
+    open_percentage = [result['open_percentage'] for result in results]
+    plays_to_die = [result['plays'] - 1 for result in results if not result['victory']]
+    guesses = [result['guess_percentage'] for result in results if result['victory']]
+    plays = sum(result['plays'] for result in results)
+    return {'episodes': len(results),
+            'victory_percentage': 100 * sum(result['victory'] for result in results) / len(results),
+            'open_percentage_mean': float(np.mean(open_percentage)),
+            'open_percentage_std': float(np.std(open_percentage)),
+            'plays_to_die_mean': float(np.mean(plays_to_die)) if plays_to_die else 0.0,
+            'plays_to_die_std': float(np.std(plays_to_die)) if plays_to_die else 0.0,
+            'guess_percentage_mean': float(np.mean(guesses)) if guesses else 0.0,
+            'wrong_plays_percentage': 100 * sum(result['wrong_plays'] for result in results) / max(plays, 1)}
+
+
+def evaluate_grid(agent_name, sizes, bombs, num_episodes, seed=0, workers=None, params=None, batch_size=1):
+    """
+    Evaluates an agent on every pair of board size and number of bombs, see evaluate.
+    Each board configuration has its own seed derived from the root seed, the size and the number of bombs,
+    so its results do not depend on the rest of the grid.
+
+    :param agent_name: name of the agent, see agents.registry.build_agent.
+    :type agent_name: str.
+    :param sizes: lengths of one side of the board.
+    :type sizes: list of ints.
+    :param bombs: numbers of bombs on the board.
+    :type bombs: list of ints.
+    :param num_episodes: number of episodes per board configuration.
+    :type num_episodes: int.
+    :param seed: root seed of the evaluation. None for a different run every time.
+    :type seed: int or None.
+    :param workers: number of worker processes. None uses every core, 1 plays in the current process.
+    :type workers: int.
+    :param params: parameters of the agent, see agents.registry.build_agent.
+    :type params: dictionary.
+    :param batch_size: number of games each worker plays at once, for agents with act_batch. 1 plays one at a time.
+    :type batch_size: int.
+    :return: size, number of bombs and metrics of each episode of each board configuration.
+    :rtype: generator of tuples (int, int, list of dictionaries).
+    """
+    for size in sizes:
+        for num_bombs in bombs:
+            cell_seed = None if seed is None else (seed, size, num_bombs)
+            yield size, num_bombs, list(evaluate(agent_name, size, num_bombs, num_episodes, cell_seed, workers,
+                                                 params, batch_size))
+
+
+def write_results(rows, name):
+    """
+    Writes one row of results per board configuration, as JSON or as CSV depending on the file extension.
+
+    :param rows: results of each board configuration.
+    :type rows: list of dictionaries.
+    :param name: file name (.json or .csv).
+    :type name: str.
+    """
+    if name.endswith('.csv'):
+        with open(name, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(dict(row, params=json.dumps(row['params'])) for row in rows)
+    else:
+        with open(name, 'w') as file:
+            json.dump(rows, file, indent=4)
+
+
+def plot_results(cells, folder):
+    """
+    Saves histograms of the number of plays until defeat, of the open percentage and of the open percentage
+    after the last guessed move in won games, with one histogram per board configuration.
+
+    :param cells: size, number of bombs and metrics of each episode of each board configuration.
+    :type cells: list of tuples (int, int, list of dictionaries).
+    :param folder: folder where the images are saved.
+    :type folder: str.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Saves images without a display
+    import matplotlib.pyplot as plt
+    os.makedirs(folder, exist_ok=True)
+    histograms = [('plays_to_die', '# plays', 'Histogram of number of plays until defeat',
+                   lambda result: result['plays'] - 1 if not result['victory'] else None),
+                  ('open_percentage', '% open', 'Histogram of open percentage',
+                   lambda result: result['open_percentage']),
+                  ('guess_percentage', '% open', 'Open board percentage after last guessed move',
+                   lambda result: result['guess_percentage'] if result['victory'] else None)]
+    for name, xlabel, title, metric in histograms:
+        plt.figure()
+        for size, bombs, results in cells:
+            values = [value for value in map(metric, results) if value is not None]
+            if values:
+                plt.hist(values, bins=20, alpha=0.6, label='%dx%d, %d bombs' % (size, size, bombs))
+        plt.legend(loc='upper right')
+        plt.xlabel(xlabel)
+        plt.ylabel('# episodes')
+        plt.title(title)
+        plt.savefig(os.path.join(folder, name + '.png'))
+        plt.close()
+
+
+def parse_param(text):
+    """
+    Parses a key=value agent parameter given in the command line. Values are read as Python literals
+    (numbers, booleans, None, ...) and otherwise kept as strings.
+    """
+    key, separator, value = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError("Parameters must be given as key=value: " + text)
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+    return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluates a minesweeper agent on a grid of board sizes and '
+                                                 'numbers of bombs, with many episodes in parallel.')
+    parser.add_argument('--agent', default='h_csp',
+                        help='%s or the module:Class path of an agent class' % ', '.join(AGENTS))
+    parser.add_argument('--param', type=parse_param, action='append', default=[], metavar='KEY=VALUE',
+                        help='parameter of the agent, e.g. max_nodes=200 (repeatable)')
+    parser.add_argument('--size', type=int, nargs='+', default=[8], help='lengths of one side of the board')
+    parser.add_argument('--bombs', type=int, nargs='+', default=[10], help='numbers of bombs on the board')
+    parser.add_argument('--episodes', type=int, default=1000, help='number of episodes per board configuration')
+    parser.add_argument('--seed', type=int, default=0, help='root seed of the evaluation')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: all cores)')
+    parser.add_argument('--weights', default=None, help='weights file of the l4ms agent')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='games played at once by each worker, for agents that act in batches (l4ms)')
+    parser.add_argument('--output', default=None, help='file where the results are written (.json or .csv)')
+    parser.add_argument('--plots', default=None, help='folder where histograms of the results are saved')
+    args = parser.parse_args()
+    for size in args.size:
+        for bombs in args.bombs:
+            if bombs >= size * size:
+                parser.error('%d bombs do not fit in a %dx%d board' % (bombs, size, size))
+
+    params = dict(args.param)
+    if args.weights is not None:
+        params['weights'] = args.weights
+    rows = []
+    cells = []
+    start = time.perf_counter()
+    for size, bombs, results in evaluate_grid(args.agent, args.size, args.bombs, args.episodes, args.seed,
+                                              args.workers, params, args.batch_size):
+        summary = summarize(results)
+        rows.append(dict({'agent': args.agent, 'params': params, 'size': size, 'bombs': bombs, 'seed': args.seed},
+                         **summary, seconds=time.perf_counter() - start))
+        cells.append((size, bombs, results))
+        start = time.perf_counter()
+        print('%dx%d, %d bombs: %s' % (size, size, bombs,
+                                       ', '.join('%s %.4g' % (name, value) for name, value in summary.items())))
+    if args.output is not None:
+        write_results(rows, args.output)
+    if args.plots is not None:
+        plot_results(cells, args.plots)
+
+
+if __name__ == '__main__':
+    main()
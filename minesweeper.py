@@ -1,7 +1,26 @@
-import random
 import numpy as np
 
 
+def neighbourhood_sum(mask):
+    """
+    Sums every tile's 3x3 neighbourhood (the tile itself included) using shifted copies of a padded array.
+    Works both on a single board (height, width) and on a stack of boards (num_boards, height, width).
+
+    :param mask: board (or stack of boards) of booleans or small integers.
+    :type mask: numpy array.
+    :return: neighbourhood sums with the same shape as mask.
+    :rtype: numpy array of int8.
+    """
+    height, width = mask.shape[-2], mask.shape[-1]
+    padding = [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(mask.astype(np.int8), padding)
+    total = np.zeros(mask.shape, dtype=np.int8)
+    for i in range(3):
+        for j in range(3):
+            total += padded[..., i:i + height, j:j + width]
+    return total
+
+
 class MinesweeperCore:
     """
     Represents the core game rules.
@@ -10,7 +29,8 @@ class MinesweeperCore:
     UNKNOWN_CELL = -1
     CLEAR_CELL = 0
 
-    def __init__(self, height, width, num_bombs, win_threshold=1.0):
+    def __init__(self, height, width, num_bombs, win_threshold=1.0, deferred_placement=False,
+                 safe_neighbourhood=False, seed=None):
         """
         Defines game parameters and initializes a new minesweeper board.
         Where the x coordinate represents the rows ranging from 0 to self.height - 1
@@ -24,46 +44,137 @@ class MinesweeperCore:
         :type num_bombs: int.
         :param win_threshold: percentage of the game board discovered to consider victory.
         :type win_threshold: float.
+        :param deferred_placement: if the bombs are only placed on the first move, away from the played tile.
+        :type deferred_placement: bool.
+        :param safe_neighbourhood: if the first move also guarantees no bombs around the played tile.
+        :type safe_neighbourhood: bool.
+        :param seed: seed or generator of the random stream used to place the bombs.
+        :type seed: int, numpy SeedSequence or numpy Generator.
         """
         self.height = height
         self.width = width
         self.num_bombs = num_bombs
         self.win_threshold = win_threshold
-        self.table = np.matrix(np.full((self.height, self.width), self.UNKNOWN_CELL))
+        self.deferred_placement = deferred_placement
+        self.safe_neighbourhood = safe_neighbourhood
+        self.rng = np.random.default_rng(seed)
+        self.table = np.full((self.height, self.width), self.UNKNOWN_CELL, dtype=np.int8)
         self.victory = False
         self.still_playing = True
         self.bomb_positions = []
         self.unexplored = self.height * self.width - self.num_bombs
         self.first_play = True
-        for i in range(self.num_bombs):
-            while True:
-                x = random.randint(0, self.height - 1)
-                y = random.randint(0, self.width - 1)
-                if (x, y) not in self.bomb_positions:
-                    self.bomb_positions.append((x, y))
-                    break
+        self.place_bombs()
 
-    def reset(self):
+    def reset(self, seed=None):
         """
         Resets the minesweeper board.
 
-        :return: reset board.
-        :rtype: numpy matrix.
+        :param seed: if given, restarts the random stream used to place the bombs from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :return: reset board, as a read-only view.
+        :rtype: numpy array of int8.
         """
-        self.table = np.matrix(np.full((self.height, self.width), self.UNKNOWN_CELL))
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.table = np.full((self.height, self.width), self.UNKNOWN_CELL, dtype=np.int8)
         self.victory = False
         self.still_playing = True
         self.bomb_positions = []
         self.unexplored = self.height * self.width - self.num_bombs
         self.first_play = True
-        for i in range(self.num_bombs):
-            while True:
-                x = random.randint(0, self.height - 1)
-                y = random.randint(0, self.width - 1)
-                if (x, y) not in self.bomb_positions:
-                    self.bomb_positions.append((x, y))
-                    break
-        return self.table
+        self.place_bombs()
+        return self.get_board()
+
+    def place_bombs(self, safe_position=None):
+        """
+        Places the bombs uniformly at random and precomputes the bomb mask and the neighbour bomb counts of every tile.
+        In deferred placement mode no bomb is placed until the first move gives a safe position.
+
+        :param safe_position: tile (x, y) that must not contain a bomb, nor its neighbours if safe_neighbourhood is set.
+        :type safe_position: tuple.
+        """
+        cells = self.height * self.width
+        if safe_position is None and self.deferred_placement:
+            flat = np.zeros(0, dtype=np.int64)
+        elif safe_position is None:
+            flat = self.rng.choice(cells, self.num_bombs, replace=False)
+        else:
+            candidates = np.flatnonzero(~self.excluded_tiles(safe_position))
+            if len(candidates) < self.num_bombs:
+                raise ValueError("Not enough tiles to place the bombs away from the first move")
+            flat = self.rng.choice(candidates, self.num_bombs, replace=False)
+        self.set_bombs(flat)
+
+    def excluded_tiles(self, safe_position):
+        """
+        Returns the tiles that must stay free of bombs on the first move.
+
+        :param safe_position: tile (x, y) of the first move.
+        :type safe_position: tuple.
+        :return: mask of the tile, and of its neighbours if safe_neighbourhood is set.
+        :rtype: numpy array of bool.
+        """
+        excluded = np.zeros((self.height, self.width), dtype=bool)
+        excluded[safe_position] = True
+        if self.safe_neighbourhood:
+            excluded = neighbourhood_sum(excluded) > 0
+        return excluded
+
+    def set_bombs(self, flat):
+        """
+        Sets the bombs and precomputes the bomb mask and the neighbour bomb counts of every tile.
+
+        :param flat: flat index i * width + j of each bomb.
+        :type flat: numpy array of int.
+        """
+        self.bomb_mask = np.zeros(self.height * self.width, dtype=bool)
+        self.bomb_mask[flat] = True
+        self.bomb_mask = self.bomb_mask.reshape(self.height, self.width)
+        self.neighbour_counts = neighbourhood_sum(self.bomb_mask)
+        self.count_list = self.neighbour_counts.ravel().tolist()  # Cheap per-tile lookups for reveal
+        rows, columns = np.divmod(flat, self.width)
+        self.bomb_positions = list(zip(rows.tolist(), columns.tolist()))
+
+    def move_bombs(self, safe_position):
+        """
+        Moves the bombs found on the first move's excluded tiles to random free tiles outside them, keeping every
+        other bomb in place. Given the bombs that stay, the moved bombs are uniform over the remaining tiles, so the
+        board is uniform over the boards without bombs on the excluded tiles, as if it had been regenerated until
+        the first move was safe.
+
+        :param safe_position: tile (x, y) of the first move.
+        :type safe_position: tuple.
+        """
+        excluded = self.excluded_tiles(safe_position).ravel()
+        bombs = self.bomb_mask.ravel()
+        num_moved = int(np.count_nonzero(bombs & excluded))
+        candidates = np.flatnonzero(~bombs & ~excluded)
+        if len(candidates) < num_moved:
+            raise ValueError("Not enough tiles to place the bombs away from the first move")
+        kept = np.flatnonzero(bombs & ~excluded)
+        self.set_bombs(np.concatenate([kept, self.rng.choice(candidates, num_moved, replace=False)]))
+
+    def first_move_safety(self, x, y):
+        """
+        Makes sure the first move on (x, y) is safe. Bombs in the way are not handled by throwing the board away:
+        only they are moved, to random tiles away from the move, see move_bombs. In deferred placement mode the
+        bombs are placed now, away from the move.
+
+        :param x: x coordinate of the first move.
+        :type x: int.
+        :param y: y coordinate of the first move.
+        :type y: int.
+        """
+        if self.deferred_placement:
+            self.place_bombs((x, y))
+            return
+        if self.safe_neighbourhood:
+            unsafe = self.neighbour_counts[x, y] > 0
+        else:
+            unsafe = self.bomb_mask[x, y]
+        if unsafe:
+            self.move_bombs((x, y))
 
     def isVictory(self):
         """
@@ -99,24 +210,72 @@ class MinesweeperCore:
             return False
         if (self.table[x, y] != self.UNKNOWN_CELL) or (not self.isPlaying()):
             return False
-        if (x, y) in self.bomb_positions:
-            if self.first_play is True:
-                self.reset()
-                return self.play(x, y)
+        if self.first_play is True:
+            self.first_move_safety(x, y)
+        if self.bomb_mask[x, y]:
             self.still_playing = False
             return True
         self.first_play = False
-        neighbour_bombs = self.neighbour_bombs(x, y)
-        self.unexplored -= 1
-        self.table[x, y] = neighbour_bombs
-        if neighbour_bombs == 0:
-            displacement = [-1, 0, 1]
-            for i in displacement:
-                for j in displacement:
-                    self.play(x + i, y + j)
+        self.reveal(x, y)
         self.verify_win()
         return True
 
+    def reveal(self, x, y):
+        """
+        Opens the (x, y) tile and, if it has no neighbour bombs, the whole connected region of
+        tiles without neighbour bombs together with its border. Small regions are opened with an explicit
+        stack, whose cost only grows with the size of the region. When the region turns out to be large,
+        it is opened at once by labelling the connected regions of the whole board, see reveal_region.
+
+        :param x: x coordinate of a tile without a bomb.
+        :type x: int.
+        :param y: y coordinate of a tile without a bomb.
+        :type y: int.
+        """
+        self.table[x, y] = self.neighbour_counts[x, y]
+        self.unexplored -= 1
+        if self.neighbour_counts[x, y] != 0:
+            return
+        # A memoryview reads and writes the tiles as python ints, much faster than numpy scalar indexing
+        counts = self.count_list
+        table = memoryview(self.table.reshape(-1))
+        limit = max(self.height * self.width // 32, 1024)  # Labelling the whole board pays off above this size
+        opened = 0
+        stack = [x * self.width + y]
+        while stack:
+            if opened > limit:
+                opened += self.reveal_region(x, y)
+                break
+            i, j = divmod(stack.pop(), self.width)
+            for k in range(max(i - 1, 0), min(i + 2, self.height)):
+                for m in range(max(j - 1, 0), min(j + 2, self.width)):
+                    neighbour = k * self.width + m
+                    if table[neighbour] == self.UNKNOWN_CELL:
+                        table[neighbour] = counts[neighbour]
+                        opened += 1
+                        if counts[neighbour] == 0:
+                            stack.append(neighbour)
+        self.unexplored -= opened
+
+    def reveal_region(self, x, y):
+        """
+        Opens the connected region of tiles without neighbour bombs containing (x, y), together with its border,
+        with vectorized operations over the whole board. Tiles already open are left as they are.
+
+        :param x: x coordinate of a tile without neighbour bombs.
+        :type x: int.
+        :param y: y coordinate of a tile without neighbour bombs.
+        :type y: int.
+        :return: number of tiles opened.
+        :rtype: int.
+        """
+        from scipy import ndimage
+        labels, _ = ndimage.label(self.neighbour_counts == 0, structure=np.ones((3, 3), dtype=bool))
+        region = neighbourhood_sum(labels == labels[x, y]) > 0
+        opened = region & (self.table == self.UNKNOWN_CELL)
+        self.table[opened] = self.neighbour_counts[opened]
+        return int(np.count_nonzero(opened))
+
     def verify_win(self):
         """
         Verifies the current state of the game and updates the state variables accordingly.
@@ -137,27 +296,275 @@ class MinesweeperCore:
         :return: number of bombs adjacent to the position (x,y).
         :rtype: int.
         """
-        neighbours = 0
-        displacement = [-1, 0, 1]
-        for i in displacement:
-            for j in displacement:
-                if (x + i, y + j) in self.bomb_positions:
-                    neighbours += 1
-        return neighbours
+        return int(self.neighbour_counts[x, y])
 
     def get_board(self, xray=False):
         """
-        Returns the board.
+        Returns the board as a read-only view, which follows the game as it is played: copy it to keep a snapshot.
 
         :param xray: if the board should show all bomb positions or not.
         :type xray: bool.
         :return: game board.
-        :rtype: numpy matrix.
+        :rtype: numpy array of int8.
         """
-        if not xray:
-            return self.table
+        board = np.where(self.bomb_mask, np.int8(self.BOMB), self.table) if xray else self.table.view()
+        board.flags.writeable = False
+        return board
+
+
+class BatchedMinesweeperCore:
+    """
+    Represents the core game rules for many boards of the same dimensions played at once.
+    Boards are stored as stacked numpy arrays and every move is applied to all boards in a single call.
+    """
+    BOMB = MinesweeperCore.BOMB
+    UNKNOWN_CELL = MinesweeperCore.UNKNOWN_CELL
+    CLEAR_CELL = MinesweeperCore.CLEAR_CELL
+
+    def __init__(self, num_boards, height, width, num_bombs, win_threshold=1.0, deferred_placement=False,
+                 safe_neighbourhood=False, seed=None):
+        """
+        Defines game parameters and initializes num_boards new minesweeper boards.
+        Coordinates follow MinesweeperCore: x indexes the rows and y indexes the columns.
+
+        :param num_boards: number of boards played simultaneously.
+        :type num_boards: int.
+        :param height: height of the boards.
+        :type height: int.
+        :param width: width of the boards.
+        :type width: int.
+        :param num_bombs: number of bomb on each board.
+        :type num_bombs: int.
+        :param win_threshold: percentage of the game board discovered to consider victory.
+        :type win_threshold: float.
+        :param deferred_placement: if the bombs are only placed on the first move, away from the played tile.
+        :type deferred_placement: bool.
+        :param safe_neighbourhood: if the first move also guarantees no bombs around the played tile.
+        :type safe_neighbourhood: bool.
+        :param seed: seed or generator of the random stream used to place the bombs.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        """
+        self.num_boards = num_boards
+        self.height = height
+        self.width = width
+        self.num_bombs = num_bombs
+        self.win_threshold = win_threshold
+        self.deferred_placement = deferred_placement
+        self.safe_neighbourhood = safe_neighbourhood
+        self.rng = np.random.default_rng(seed)
+        self.table = np.full((num_boards, height, width), self.UNKNOWN_CELL, dtype=np.int8)
+        self.bomb_mask = np.zeros((num_boards, height, width), dtype=bool)
+        self.neighbour_counts = np.zeros((num_boards, height, width), dtype=np.int8)
+        self.victory = np.zeros(num_boards, dtype=bool)
+        self.still_playing = np.ones(num_boards, dtype=bool)
+        self.first_play = np.ones(num_boards, dtype=bool)
+        self.unexplored = np.full(num_boards, height * width - num_bombs, dtype=np.int64)
+        self.reset()
+
+    def reset(self, boards=None, seed=None):
+        """
+        Resets the selected minesweeper boards.
+
+        :param boards: boards to reset, as a boolean mask or an array of indices. All boards when None.
+        :type boards: numpy array.
+        :param seed: if given, restarts the random stream used to place the bombs from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :return: reset boards, as a read-only view.
+        :rtype: numpy array of int8 with shape (num_boards, height, width).
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        if boards is None:
+            boards = np.arange(self.num_boards)
+        boards = self._board_indices(boards)
+        self.table[boards] = self.UNKNOWN_CELL
+        self.victory[boards] = False
+        self.still_playing[boards] = True
+        self.first_play[boards] = True
+        self.unexplored[boards] = self.height * self.width - self.num_bombs
+        self._place_bombs(boards)
+        return self.get_board()
+
+    def _board_indices(self, boards):
+        """
+        Converts a boolean mask or a list of indices to an array of board indices.
+        """
+        boards = np.asarray(boards)
+        if boards.dtype == bool:
+            return np.nonzero(boards)[0]
+        return boards.astype(np.int64)
+
+    def _place_bombs(self, boards, xs=None, ys=None):
+        """
+        Places num_bombs bombs uniformly at random on each of the selected boards, using random sort keys
+        so that all boards are filled in one vectorized call. In deferred placement mode no bomb is placed
+        until the first move gives the safe positions.
+
+        :param boards: indices of the boards receiving new bombs.
+        :type boards: numpy array.
+        :param xs: x coordinate of the tile that must stay safe on each selected board.
+        :type xs: numpy array of int.
+        :param ys: y coordinate of the tile that must stay safe on each selected board.
+        :type ys: numpy array of int.
+        """
+        cells = self.height * self.width
+        mask = np.zeros((len(boards), cells), dtype=bool)
+        if self.num_bombs > 0 and (xs is not None or not self.deferred_placement):
+            keys = self.rng.random((len(boards), cells))
+            if xs is not None:
+                excluded = self._excluded_tiles(xs, ys)
+                if np.any(cells - excluded.sum(axis=1) < self.num_bombs):
+                    raise ValueError("Not enough tiles to place the bombs away from the first move")
+                # Keys are drawn from [0, 1), so excluded tiles sort after every candidate tile
+                keys[excluded] = 2.0
+            if self.num_bombs < cells:
+                flat = np.argpartition(keys, self.num_bombs - 1, axis=1)[:, :self.num_bombs]
+            else:
+                flat = np.tile(np.arange(cells), (len(boards), 1))
+            np.put_along_axis(mask, flat, True, axis=1)
+        mask = mask.reshape(len(boards), self.height, self.width)
+        self.bomb_mask[boards] = mask
+        self.neighbour_counts[boards] = neighbourhood_sum(mask)
+
+    def _excluded_tiles(self, xs, ys):
+        """
+        Returns the tiles that must stay free of bombs on the first move of each board, see
+        MinesweeperCore.excluded_tiles.
+
+        :param xs: x coordinate of the first move on each board.
+        :type xs: numpy array of int.
+        :param ys: y coordinate of the first move on each board.
+        :type ys: numpy array of int.
+        :return: flat mask of the excluded tiles of each board.
+        :rtype: numpy array of bool with shape (len(xs), height * width).
+        """
+        excluded = np.zeros((len(xs), self.height, self.width), dtype=bool)
+        excluded[np.arange(len(xs)), xs, ys] = True
+        if self.safe_neighbourhood:
+            excluded = neighbourhood_sum(excluded) > 0
+        return excluded.reshape(len(xs), self.height * self.width)
+
+    def _move_bombs(self, boards, xs, ys):
+        """
+        Moves the bombs found on the excluded tiles of each selected board to random free tiles outside them,
+        keeping every other bomb in place, as MinesweeperCore.move_bombs does.
+
+        :param boards: indices of the boards whose bombs are moved.
+        :type boards: numpy array.
+        :param xs: x coordinate of the first move on each selected board.
+        :type xs: numpy array of int.
+        :param ys: y coordinate of the first move on each selected board.
+        :type ys: numpy array of int.
+        """
+        cells = self.height * self.width
+        excluded = self._excluded_tiles(xs, ys)
+        mask = self.bomb_mask[boards].reshape(len(boards), cells)
+        num_moved = (mask & excluded).sum(axis=1)
+        keys = self.rng.random((len(boards), cells))
+        # Keys are drawn from [0, 1), so bombs and excluded tiles sort after every free tile
+        keys[mask | excluded] = 2.0
+        if np.any((keys < 2.0).sum(axis=1) < num_moved):
+            raise ValueError("Not enough tiles to place the bombs away from the first move")
+        # The num_moved free tiles with the smallest keys of each board receive the moved bombs
+        chosen = np.zeros_like(mask)
+        np.put_along_axis(chosen, np.argsort(keys, axis=1), np.arange(cells) < num_moved[:, None], axis=1)
+        mask = ((mask & ~excluded) | chosen).reshape(len(boards), self.height, self.width)
+        self.bomb_mask[boards] = mask
+        self.neighbour_counts[boards] = neighbourhood_sum(mask)
+
+    def isVictory(self):
+        """
+        Returns the state of every game.
+
+        :return: victory flags.
+        :rtype: numpy array of bool.
+        """
+        return self.victory
+
+    def isPlaying(self):
+        """
+        Returns which games are still being played.
+
+        :return: still playing flags.
+        :rtype: numpy array of bool.
+        """
+        return self.still_playing
+
+    def play(self, xs, ys):
+        """
+        Executes one discovering action on every board, the i-th board being played on (xs[i], ys[i]).
+        Follows the rules of MinesweeperCore.play, including first move safety and the flood fill of zero tiles.
+
+        :param xs: x coordinate of the move on each board.
+        :type xs: numpy array of int.
+        :param ys: y coordinate of the move on each board.
+        :type ys: numpy array of int.
+        :return: output of the discovering decision on each board.
+            True for successful action and False for incorrect action.
+        :rtype: numpy array of bool.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        boards = np.arange(self.num_boards)
+        inside = (0 <= xs) & (xs < self.height) & (0 <= ys) & (ys < self.width)
+        xs = np.clip(xs, 0, self.height - 1)
+        ys = np.clip(ys, 0, self.width - 1)
+        valid = inside & self.still_playing & (self.table[boards, xs, ys] == self.UNKNOWN_CELL)
+        # First move safety: bombs in the way are moved away from the played tile, as MinesweeperCore does
+        first = valid & self.first_play
+        if self.deferred_placement:
+            if first.any():
+                self._place_bombs(boards[first], xs[first], ys[first])
         else:
-            xray_table = np.copy(self.table)
-            for position in self.bomb_positions:
-                xray_table[position[0], position[1]] = self.BOMB
-            return xray_table
+            if self.safe_neighbourhood:
+                unsafe = self.neighbour_counts[boards, xs, ys] > 0
+            else:
+                unsafe = self.bomb_mask[boards, xs, ys]
+            move = first & unsafe
+            if move.any():
+                self._move_bombs(boards[move], xs[move], ys[move])
+        hit = valid & self.bomb_mask[boards, xs, ys]
+        self.still_playing[hit] = False
+        safe = valid & ~hit
+        self.first_play[safe] = False
+        played = boards[safe]
+        if len(played) == 0:
+            return valid
+        # Flood fill: repeatedly opens the unknown neighbours of opened zero tiles
+        counts = self.neighbour_counts[played]
+        closed = (self.table[played] == self.UNKNOWN_CELL) & ~self.bomb_mask[played]
+        revealed = np.zeros(counts.shape, dtype=bool)
+        revealed[np.arange(len(played)), xs[safe], ys[safe]] = True
+        frontier = revealed & (counts == 0)
+        while frontier.any():
+            opened = (neighbourhood_sum(frontier) > 0) & closed & ~revealed
+            revealed |= opened
+            frontier = opened & (counts == 0)
+        self.table[played] = np.where(revealed, counts, self.table[played])
+        self.unexplored[played] -= revealed.sum(axis=(1, 2))
+        self.verify_win(played)
+        return valid
+
+    def verify_win(self, boards):
+        """
+        Verifies the current state of the selected games and updates the state variables accordingly.
+
+        :param boards: indices of the boards to verify.
+        :type boards: numpy array.
+        """
+        won = self.unexplored[boards] <= (1 - self.win_threshold) * self.height * self.width
+        self.victory[boards[won]] = True
+        self.still_playing[boards[won]] = False
+
+    def get_board(self, xray=False):
+        """
+        Returns the boards as a read-only view, which follows the games as they are played.
+
+        :param xray: if the boards should show all bomb positions or not.
+        :type xray: bool.
+        :return: game boards.
+        :rtype: numpy array of int8 with shape (num_boards, height, width).
+        """
+        boards = np.where(self.bomb_mask, np.int8(self.BOMB), self.table) if xray else self.table.view()
+        boards.flags.writeable = False
+        return boards
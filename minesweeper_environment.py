@@ -1,12 +1,13 @@
 import numpy as np
-from minesweeper import MinesweeperCore
+from minesweeper import MinesweeperCore, BatchedMinesweeperCore
 
 
 class MinesweeperEnvironment:
     """
     Reinforcement Learning wrapper to the core game.
     """
-    def __init__(self, height, width, num_bombs, win_threshold=1.0):
+    def __init__(self, height, width, num_bombs, win_threshold=1.0, deferred_placement=False,
+                 safe_neighbourhood=False, seed=None):
         """
         Initializes the RL wrapper.
 
@@ -18,20 +19,29 @@ class MinesweeperEnvironment:
         :type num_bombs: int.
         :param win_threshold: percentage of the game board discovered to consider victory.
         :type win_threshold: float.
+        :param deferred_placement: if the bombs are only placed on the first move, away from the played tile.
+        :type deferred_placement: bool.
+        :param safe_neighbourhood: if the first move also guarantees no bombs around the played tile.
+        :type safe_neighbourhood: bool.
+        :param seed: seed or generator of the random stream used to place the bombs.
+        :type seed: int, numpy SeedSequence or numpy Generator.
         """
         self.height = height
         self.width = width
         self.num_bombs = num_bombs
-        self.game = MinesweeperCore(height, width, num_bombs, win_threshold)
+        self.game = MinesweeperCore(height, width, num_bombs, win_threshold,
+                                    deferred_placement, safe_neighbourhood, seed)
 
-    def reset(self):
+    def reset(self, seed=None):
         """
         Resets the game board.
 
-        :return: reset board.
-        :rtype: numpy matrix.
+        :param seed: if given, restarts the random stream used to place the bombs from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :return: reset board, as a read-only view.
+        :rtype: numpy array of int8.
         """
-        return self.game.reset()
+        return self.game.reset(seed)
 
     def reward_engineering(self):
         """
@@ -56,10 +66,10 @@ class MinesweeperEnvironment:
         :type x: int.
         :param y: y coordinate on the game board.
         :type y: int.
-        :return: (game board after the action was executed,
+        :return: (game board after the action was executed, as a read-only view,
             reward produced by the action,
             flag corresponding to the condition still playing)
-        :rtype: (numpy matrix, int, bool).
+        :rtype: (numpy array of int8, int, bool).
         """
         self.game.play(x, y)
         next_state = self.game.get_board()
@@ -69,12 +79,12 @@ class MinesweeperEnvironment:
 
     def get_state(self, xray=False):
         """
-        Returns the board.
+        Returns the board as a read-only view, which follows the game as it is played: copy it to keep a snapshot.
 
         :param xray: if the board should show all bomb positions or not.
         :type xray: bool.
         :return: game board.
-        :rtype: numpy matrix.
+        :rtype: numpy array of int8.
         """
         return self.game.get_board(xray)
 
@@ -131,3 +141,118 @@ class MinesweeperEnvironment:
         Prints all known bomb positions.
         """
         print("Bomb positions: " + str(self.game.bomb_positions))
+
+
+class BatchedMinesweeperEnvironment:
+    """
+    Reinforcement Learning wrapper to many games played at once.
+    """
+    def __init__(self, num_boards, height, width, num_bombs, win_threshold=1.0, deferred_placement=False,
+                 safe_neighbourhood=False, seed=None):
+        """
+        Initializes the batched RL wrapper.
+
+        :param num_boards: number of boards played simultaneously.
+        :type num_boards: int.
+        :param height: height of the boards.
+        :type height: int.
+        :param width: width of the boards.
+        :type width: int.
+        :param num_bombs: number of bomb on each board.
+        :type num_bombs: int.
+        :param win_threshold: percentage of the game board discovered to consider victory.
+        :type win_threshold: float.
+        :param deferred_placement: if the bombs are only placed on the first move, away from the played tile.
+        :type deferred_placement: bool.
+        :param safe_neighbourhood: if the first move also guarantees no bombs around the played tile.
+        :type safe_neighbourhood: bool.
+        :param seed: seed or generator of the random stream used to place the bombs.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        """
+        self.num_boards = num_boards
+        self.height = height
+        self.width = width
+        self.num_bombs = num_bombs
+        self.game = BatchedMinesweeperCore(num_boards, height, width, num_bombs, win_threshold,
+                                           deferred_placement, safe_neighbourhood, seed)
+
+    def reset(self, boards=None, seed=None):
+        """
+        Resets the selected game boards.
+
+        :param boards: boards to reset, as a boolean mask or an array of indices. All boards when None.
+        :type boards: numpy array.
+        :param seed: if given, restarts the random stream used to place the bombs from this seed or generator.
+        :type seed: int, numpy SeedSequence or numpy Generator.
+        :return: reset boards, as a read-only view.
+        :rtype: numpy array of int8 with shape (num_boards, height, width).
+        """
+        return self.game.reset(boards, seed)
+
+    def reward_engineering(self):
+        """
+        Computes the reward of every board and returns it.
+
+        :return: rewards of RL.
+        :rtype: numpy array of int.
+        """
+        open_table = np.sum(self.game.table != self.game.UNKNOWN_CELL, axis=(1, 2))
+        return np.where(self.game.still_playing, 1, np.where(self.game.victory, open_table, 0))
+
+    def step(self, xs, ys):
+        """
+        Performs one discovering action on each board and computes the rewards produced.
+
+        :param xs: x coordinate of the move on each board.
+        :type xs: numpy array of int.
+        :param ys: y coordinate of the move on each board.
+        :type ys: numpy array of int.
+        :return: (game boards after the actions were executed, as a read-only view,
+            rewards produced by the actions,
+            flags corresponding to the condition finished)
+        :rtype: (numpy array of int8, numpy array of int, numpy array of bool).
+        """
+        self.game.play(xs, ys)
+        next_state = self.game.get_board()
+        reward = self.reward_engineering()
+        done = ~self.game.still_playing
+        return next_state, reward, done
+
+    def get_state(self, xray=False):
+        """
+        Returns the boards as a read-only view, which follows the games as they are played.
+
+        :param xray: if the boards should show all bomb positions or not.
+        :type xray: bool.
+        :return: game boards.
+        :rtype: numpy array of int8 with shape (num_boards, height, width).
+        """
+        return self.game.get_board(xray)
+
+    def is_finished(self):
+        """
+        Returns which games are finished.
+
+        :return: is finished flags.
+        :rtype: numpy array of bool.
+        """
+        return ~self.game.still_playing
+
+    def is_victory(self):
+        """
+        Returns the state of every game.
+
+        :return: victory flags.
+        :rtype: numpy array of bool.
+        """
+        return self.game.isVictory()
+
+    def get_open_percentage(self):
+        """
+        Computes the percentage of each board that has been uncovered.
+
+        :return: uncovered percentage of each board.
+        :rtype: numpy array of float.
+        """
+        open_table = np.sum(self.game.table != self.game.UNKNOWN_CELL, axis=(1, 2))
+        return open_table / (self.height * self.width - self.num_bombs)
@@ -2,25 +2,136 @@ import glob
 import numpy as np
 
 # This file pre-processes the dataset mapping X to Y by
-# concatenating all dataset files,
+# reading all dataset files one at a time,
 # removing the repeated game states in X and finally
 # creating two new files for X and Y which will be used
-# in training.
-
-
-filesX = sorted(glob.glob("dataset/dataset_X*"))
-filesY = sorted(glob.glob("dataset/dataset_Y*"))
-
-X = np.concatenate([np.load(datafile) for datafile in filesX])
-Y = np.concatenate([np.load(datafile) for datafile in filesY])
-print("Original shapes:")
-print(X.shape)
-print(Y.shape)
-_, ix, counts = np.unique(X, return_counts=True, axis=0, return_index=True)
-X = X[ix]
-Y = Y[ix]
-np.save('dataset/dataset_X', X)
-np.save('dataset/dataset_Y', Y)
-print("Final shapes:")
-print(X.shape)
-print(Y.shape)
+# in training. Repeated boards are found by hashing, so memory stays
+# bounded by the number of distinct boards (16 bytes each), and the new files
+# are written through memory maps, to be read the same way by dataset_loader.py.
+# With SOFT_TARGETS, Y holds for each board the distribution of the tiles played on all of
+# its copies instead of the tile played on its first copy.
+
+SOFT_TARGETS = False
+CHUNK_SIZE = 100000
+
+
+def board_hashes(boards):
+    """
+    Hashes each board to 64 bits, mixing its bytes as 64-bit words.
+    Two different boards sharing a hash is unlikely enough (about 1 in 10^5 for 10^7 boards) to be ignored.
+
+    :param boards: int8 boards with shape (samples, side, side).
+    :type boards: numpy array.
+    :return: hash of each board.
+    :rtype: numpy array of uint64.
+    """
+    flat = np.ascontiguousarray(boards).reshape(len(boards), -1)
+    padding = -flat.shape[1] % 8
+    words = np.pad(flat, ((0, 0), (0, padding))).view(np.uint64)
+    hashes = np.full(len(boards), 0xcbf29ce484222325, dtype=np.uint64)
+    for k in range(words.shape[1]):
+        hashes ^= words[:, k]
+        hashes *= np.uint64(0x100000001b3)
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+class BoardIndex:
+    """
+    Numbers distinct board hashes in order of first appearance. Hashes are kept in sorted runs, and two runs are
+    merged when they have similar sizes, so adding n hashes costs O(n log n) overall.
+    """
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.runs = []  # (sorted hashes, their ids)
+        self.size = 0
+
+    def lookup(self, hashes):
+        """
+        Finds the ids of hashes.
+
+        :param hashes: board hashes.
+        :type hashes: numpy array of uint64.
+        :return: id of each hash, -1 for unknown hashes.
+        :rtype: numpy array of int64.
+        """
+        ids = np.full(len(hashes), -1, dtype=np.int64)
+        for keys, values in self.runs:
+            positions = np.minimum(np.searchsorted(keys, hashes), len(keys) - 1)
+            found = keys[positions] == hashes
+            ids[found] = values[positions[found]]
+        return ids
+
+    def add(self, hashes):
+        """
+        Gives ids to the unknown hashes.
+
+        :param hashes: board hashes.
+        :type hashes: numpy array of uint64.
+        """
+        new, first = np.unique(hashes[self.lookup(hashes) < 0], return_index=True)
+        if len(new) == 0:
+            return
+        ids = np.empty(len(new), dtype=np.int64)
+        ids[np.argsort(first)] = np.arange(self.size, self.size + len(new))
+        self.size += len(new)
+        self.runs.append((new, ids))
+        while len(self.runs) > 1 and len(self.runs[-2][0]) <= 2 * len(self.runs[-1][0]):
+            (keys, values), (other_keys, other_values) = self.runs.pop(), self.runs.pop()
+            keys = np.concatenate([other_keys, keys])
+            values = np.concatenate([other_values, values])
+            order = np.argsort(keys, kind='stable')
+            self.runs.append((keys[order], values[order]))
+
+
+if __name__ == '__main__':
+    filesY = sorted(glob.glob("dataset/dataset_Y_*.npy"))
+    filesX = [datafile.replace('dataset_Y_', 'dataset_X_') for datafile in filesY]
+
+    # First pass: numbers the distinct boards
+    index = BoardIndex()
+    num_samples = 0
+    for fileX in filesX:
+        boards = np.load(fileX, mmap_mode='r')
+        for start in range(0, len(boards), CHUNK_SIZE):
+            index.add(board_hashes(boards[start:start + CHUNK_SIZE]))
+        num_samples += len(boards)
+    shape = np.load(filesX[0], mmap_mode='r').shape[1:]
+    print("Original shapes:")
+    print((num_samples,) + shape)
+    print((num_samples,))
+
+    # Second pass: writes each distinct board once, with its first label or with all its labels counted
+    finalX = np.lib.format.open_memmap('dataset/dataset_X.npy', mode='w+', dtype=np.int8, shape=(index.size,) + shape)
+    if SOFT_TARGETS:
+        finalY = np.lib.format.open_memmap('dataset/dataset_Y.npy', mode='w+', dtype=np.float32,
+                                           shape=(index.size, shape[0] * shape[1]))
+    else:
+        finalY = np.lib.format.open_memmap('dataset/dataset_Y.npy', mode='w+',
+                                           dtype=np.load(filesY[0], mmap_mode='r').dtype, shape=(index.size,))
+    written = np.zeros(index.size, dtype=bool)
+    for fileX, fileY in zip(filesX, filesY):
+        boards = np.load(fileX, mmap_mode='r')
+        labels = np.load(fileY, mmap_mode='r')
+        for start in range(0, len(boards), CHUNK_SIZE):
+            ids = index.lookup(board_hashes(boards[start:start + CHUNK_SIZE]))
+            chunk_labels = np.asarray(labels[start:start + CHUNK_SIZE])
+            _, first = np.unique(ids, return_index=True)
+            first = first[~written[ids[first]]]
+            finalX[ids[first]] = boards[start:start + CHUNK_SIZE][first]
+            written[ids[first]] = True
+            if SOFT_TARGETS:
+                np.add.at(finalY, (ids, chunk_labels), 1)
+            else:
+                finalY[ids[first]] = chunk_labels[first]
+    if SOFT_TARGETS:
+        for start in range(0, index.size, CHUNK_SIZE):
+            counts = finalY[start:start + CHUNK_SIZE]
+            finalY[start:start + CHUNK_SIZE] = counts / counts.sum(axis=1, keepdims=True)
+    finalX.flush()
+    finalY.flush()
+    print("Final shapes:")
+    print(finalX.shape)
+    print(finalY.shape)
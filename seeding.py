@@ -0,0 +1,35 @@
+import numpy as np
+
+# Helpers to derive independent and reproducible random streams from a single seed.
+# The game core, the environments and the agents all accept the seeds produced here.
+
+
+def spawn_seeds(seed, n):
+    """
+    Derives n independent child seeds from a root seed.
+
+    :param seed: root seed. None draws fresh entropy from the operating system.
+    :type seed: int, tuple of ints, numpy SeedSequence or None.
+    :param n: number of child seeds.
+    :type n: int.
+    :return: child seeds.
+    :rtype: list of numpy SeedSequence.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(n)
+
+
+def episode_seeds(seed, num_episodes):
+    """
+    Derives one (game seed, agent seed) pair per episode. Since every episode owns its streams,
+    results do not depend on how the episodes are split between parallel workers.
+
+    :param seed: root seed. None draws fresh entropy from the operating system.
+    :type seed: int, tuple of ints, numpy SeedSequence or None.
+    :param num_episodes: number of episodes.
+    :type num_episodes: int.
+    :return: game and agent seeds of each episode.
+    :rtype: list of tuples (numpy SeedSequence, numpy SeedSequence).
+    """
+    return [tuple(episode.spawn(2)) for episode in spawn_seeds(seed, num_episodes)]
@@ -1,12 +1,7 @@
 import os
-from time import time
-import numpy as np
-from sklearn.model_selection import train_test_split
-from tensorflow import keras
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.utils import to_categorical
 from tensorflow.keras.callbacks import TensorBoard, ModelCheckpoint
 from agents.L4MSAgent import L4MSAgent
+from dataset_loader import DatasetLoader
 
 # Some PCs needed these configurations in order to run with GPU.
 #from tensorflow.compat.v1 import ConfigProto
@@ -22,34 +17,29 @@ os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
 EPOCHS = 5
 BATCH_SIZE = 128
 
-# Loads training set
-train_features = np.load('dataset/dataset_X.npy')
-train_features = (train_features + 1) / 10.0
-train_labels = np.load('dataset/dataset_Y.npy')
+# Minesweeper agent configuration
+side = 8
+bombs = 10
+
+# Opens training set without loading it in memory: normalized batches are read from disk as training goes
+dataset = DatasetLoader('dataset', BATCH_SIZE, seed=3)
 
 # Splits training set into train and cross-validation sets
-train_features, validation_features, train_labels, validation_labels = \
-    train_test_split(train_features, train_labels, test_size=0.05, random_state=3)
+train_data, validation_data = dataset.split(0.05)
 
-print('# of training set:', train_features.shape[0])
-print('# of cross-validation set:', validation_features.shape[0])
+print('# of training set:', len(train_data.indices))
+print('# of cross-validation set:', len(validation_data.indices))
 
-print('X shape: ', train_features.shape)
-print('Y shape: ', train_labels.shape)
+print('X shape: ', dataset.boards.shape)
+print('Y shape: ', dataset.labels.shape)
 
-# Minesweeper agent configuration
-side = 8
-bombs = 10
 agent = L4MSAgent(side)
 
-X_train, y_train = train_features, train_labels
-X_validation, y_validation = validation_features, validation_labels
-
-train_generator = ImageDataGenerator().flow(X_train, y_train, batch_size=BATCH_SIZE)
-validation_generator = ImageDataGenerator().flow(X_validation, y_validation, batch_size=BATCH_SIZE)
+train_generator = train_data.batches()
+validation_generator = validation_data.batches()
 
-steps_per_epoch = X_train.shape[0] // BATCH_SIZE
-validation_steps = X_validation.shape[0] // BATCH_SIZE
+steps_per_epoch = len(train_data)
+validation_steps = len(validation_data)
 model = "best_model.hdf5"
 if os.path.exists(model):
     print('Loading weights from previous learning session.')
@@ -61,6 +51,6 @@ checkpoint = ModelCheckpoint("best_model.hdf5", monitor='loss', verbose=1, save_
 tensorboard = TensorBoard(log_dir="logs")
 agent.model.fit(train_generator, steps_per_epoch=steps_per_epoch, epochs=EPOCHS,
                 validation_data=validation_generator, validation_steps=validation_steps,
-                shuffle=True, callbacks=[tensorboard, checkpoint])
+                callbacks=[tensorboard, checkpoint])
 
 agent.model.save_weights('final_weights.h5')